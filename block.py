@@ -1,8 +1,10 @@
-from dataclasses import dataclass, field
-from typing import List, Optional
+from dataclasses import InitVar, dataclass, field
+from typing import Callable, List, Optional, Sequence, Tuple
 from datetime import datetime, timezone
-from custom_hash import custom_hash256
-from transaction import Transaction
+from custom_hash import (
+    custom_hash256, custom_hash256_int, CustomHasher, custom_hash256_batch_state, below_target_mask,
+)
+from transaction import Transaction, transaction_from_dict
 
 def merkle_root_hash(tx_ids: list[str]) -> str:
     """
@@ -24,6 +26,122 @@ def merkle_root_hash(tx_ids: list[str]) -> str:
     return layer[0]
 
 
+def pow_target(difficulty: int) -> int:
+    """
+    Integer PoW target: a 256-bit hash has `difficulty` leading hex zeros
+    exactly when int(hash) < pow_target(difficulty).
+    """
+    return 1 << (256 - 4 * difficulty)
+
+
+def hash_to_hex(h: int) -> str:
+    return f"{h:064x}"
+
+
+class MerkleTree:
+    """
+    Merkle tree that keeps all of its layers (same duplicate-last rule as merkle_root_hash).
+    append() and replace() only rehash the O(log n) path from the changed leaf to the root.
+    """
+    __slots__ = ("layers",)
+
+    def __init__(self, leaves: Optional[List[str]] = None):
+        self.layers: List[List[str]] = [list(leaves or [])]
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self.layers = self.layers[:1]
+        layer = self.layers[0]
+        while len(layer) > 1:
+            next_layer = []
+            for i in range(0, len(layer), 2):
+                a = layer[i]
+                b = layer[i + 1] if i + 1 < len(layer) else a  # duplicate if odd
+                next_layer.append(custom_hash256(a + b))
+            self.layers.append(next_layer)
+            layer = next_layer
+
+    def _update_path(self, i: int) -> None:
+        level = 0
+        while len(self.layers[level]) > 1:
+            layer = self.layers[level]
+            if level + 1 == len(self.layers):
+                self.layers.append([])
+            parent = self.layers[level + 1]
+            left = i - (i % 2)
+            a = layer[left]
+            b = layer[left + 1] if left + 1 < len(layer) else a
+            j = left // 2
+            node = custom_hash256(a + b)
+            if j == len(parent):
+                parent.append(node)
+            else:
+                parent[j] = node
+            i = j
+            level += 1
+
+    @property
+    def leaves(self) -> List[str]:
+        return self.layers[0]
+
+    def __len__(self) -> int:
+        return len(self.layers[0])
+
+    @property
+    def root(self) -> str:
+        if not self.layers[0]:
+            return custom_hash256("")
+        return self.layers[-1][0]
+
+    def append(self, leaf: str) -> None:
+        self.layers[0].append(leaf)
+        self._update_path(len(self.layers[0]) - 1)
+
+    def replace(self, i: int, leaf: str) -> None:
+        if self.layers[0][i] == leaf:
+            return
+        self.layers[0][i] = leaf
+        self._update_path(i)
+
+    def proof(self, i: int) -> List[Tuple[str, bool]]:
+        """
+        Inclusion proof for leaf i: [(sibling_hash, sibling_is_left), ...] from leaf to root.
+        An odd last node is paired with itself, exactly as when the tree was built.
+        """
+        path = []
+        for layer in self.layers[:-1]:
+            if i % 2:
+                path.append((layer[i - 1], True))
+            else:
+                path.append((layer[i + 1] if i + 1 < len(layer) else layer[i], False))
+            i //= 2
+        return path
+
+    def root_with(self, i: int, leaf: str) -> str:
+        """Root as if leaf i were `leaf`: O(log n) along its path, the tree itself is not changed."""
+        node = leaf
+        for layer in self.layers[:-1]:
+            if i % 2:
+                node = custom_hash256(layer[i - 1] + node)
+            else:
+                node = custom_hash256(node + (layer[i + 1] if i + 1 < len(layer) else node))
+            i //= 2
+        return node
+
+    def copy(self) -> "MerkleTree":
+        clone = MerkleTree.__new__(MerkleTree)
+        clone.layers = [layer[:] for layer in self.layers]
+        return clone
+
+
+def verify_merkle_proof(tx_id: str, proof: List[Tuple[str, bool]], root: str) -> bool:
+    """Check a MerkleTree.proof() against a block's tx_root without the block's transactions."""
+    h = tx_id
+    for sibling, sibling_is_left in proof:
+        h = custom_hash256(sibling + h) if sibling_is_left else custom_hash256(h + sibling)
+    return h == root
+
+
 @dataclass
 class BlockHeader:
     prev_hash: str
@@ -32,44 +150,120 @@ class BlockHeader:
     tx_root: str                        # Merkle (or simple) root
     nonce: int = 0
     difficulty: int = 3                 # number of leading zeros required
+    state_root: Optional[str] = None    # account busenos saknis po bloko (jei blokas ja isipareigoja)
 
     def serialize(self) -> str:
-        """Deterministic serialization of the 6 header fields, in order."""
-        # NOTE: Keep this order: prev_hash | timestamp | version | tx_root | nonce | difficulty
-        return "|".join([
-            self.prev_hash,
-            str(self.timestamp),
-            self.version,
-            self.tx_root,
-            str(self.nonce),
-            str(self.difficulty),
-        ])
+        """Deterministic serialization of the header fields, in order."""
+        # NOTE: Keep this order: prev_hash | timestamp | version | tx_root | [state_root |] nonce | difficulty
+        return self.prefix() + f"{self.nonce}|{self.difficulty}"
+
+    def prefix(self) -> str:
+        """The nonce-independent part of serialize(): everything before the nonce."""
+        fields = [self.prev_hash, str(self.timestamp), self.version, self.tx_root]
+        if self.state_root is not None:  # be state_root antraste (ir hash) tokia pati kaip anksciau
+            fields.append(self.state_root)
+        return "|".join(fields) + "|"
 
     def hash(self) -> str:
         return custom_hash256(self.serialize())
 
+    def hash_int(self) -> int:
+        return custom_hash256_int(self.serialize())
 
-@dataclass
+
+@dataclass(slots=True)
 class Block:
     index: int
-    transactions: List[Transaction]
+    transactions: Sequence[Transaction]  # laikoma tuple – keisti tik priskiriant nauja seka
     prev_hash: str
     version: str = "v0.1"
     difficulty: int = 3
     timestamp: int = field(default_factory=lambda: int(datetime.now(timezone.utc).timestamp()))
     nonce: int = 0
     hash: Optional[str] = None
+    # jau pastatytas medis – tada lapai tik sutikrinami, ne perhashinami
+    merkle: InitVar[Optional[MerkleTree]] = None
+    # BlockTemplate: bendras ruosinio medis ir jau suskaiciuota saknis – lapai netikrinami,
+    # medis kopijuojamas tik tada, kai jo prireikia (merkle_tree)
+    shared_merkle_root: InitVar[Optional[str]] = None
 
     # Derived fields (computed on init)
     tx_root: str = field(init=False)
+    # busenos (balansu) medzio saknis po bloko pritaikymo – antrastes dalis (ieina i PoW hash),
+    # nustatoma ruosinyje pries kasima; None – blokas busenai neisipareigoja
+    state_root: Optional[str] = field(default=None, init=False)
+    _merkle: MerkleTree = field(init=False, repr=False, compare=False)
+    _merkle_shared: bool = field(default=False, init=False, repr=False, compare=False)
+    # kvieciamas pasikeitus bet kuriam viesam laukui (Blockchain juo naikina checkpoint'a)
+    _on_change: Optional[Callable[["Block"], None]] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self, merkle: Optional[MerkleTree] = None, shared_merkle_root: Optional[str] = None):
+        if shared_merkle_root is not None:
+            self._merkle = merkle
+            self._merkle_shared = True
+            self.tx_root = shared_merkle_root
+            return
+        tx_ids = [tx.tx_id for tx in self.transactions]
+        if merkle is None:
+            merkle = MerkleTree(tx_ids)
+        elif merkle.leaves != tx_ids:
+            raise ValueError("prebuilt Merkle tree does not match block transactions")
+        self._merkle = merkle
+        self.tx_root = merkle.root
+
+    def __setattr__(self, name, value):
+        if name == "transactions":
+            value = tuple(value)  # vietoje (append/pop) nekeiciama – pakeitimas visada pasiekia listener'i
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            listener = getattr(self, "_on_change", None)  # dar nepriskirtas __init__ metu
+            if listener is not None:
+                listener(self)
 
-    def __post_init__(self):
+    def __getstate__(self):
+        # listener'is rodo i visa Blockchain – jo nesiunciam i kitus procesus
+        state = {name: getattr(self, name) for name in self.__slots__ if hasattr(self, name)}
+        state["_on_change"] = None
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    @property
+    def merkle_tree(self) -> MerkleTree:
+        """
+        Cached Merkle tree synced with the current transaction list: unchanged
+        tx ids cost nothing, changed ones are replaced leaf by leaf (O(log n) each).
+        """
+        tree = self._merkle
+        if self._merkle_shared:  # ruosinio medis – keiciama tik sio bloko kopija
+            tree = self._merkle = tree.copy()
+            self._merkle_shared = False
         tx_ids = [tx.tx_id for tx in self.transactions]
-        self.tx_root = merkle_root_hash(tx_ids)
+        leaves = tree.leaves
+        if len(tx_ids) < len(leaves):
+            tree = self._merkle = MerkleTree(tx_ids)
+            return tree
+        for i, tx_id in enumerate(tx_ids):
+            if i < len(leaves):
+                if leaves[i] != tx_id:
+                    tree.replace(i, tx_id)
+            else:
+                tree.append(tx_id)
+        return tree
+
+    def merkle_proof(self, tx_id: str) -> Optional[List[Tuple[str, bool]]]:
+        """Inclusion proof for tx_id against self.tx_root, or None if the tx is not in this block."""
+        tree = self.merkle_tree
+        try:
+            i = tree.leaves.index(tx_id)
+        except ValueError:
+            return None
+        return tree.proof(i)
 
     def verify_merkle_root(self) -> bool:
-        recomputed = merkle_root_hash([tx.tx_id for tx in self.transactions])
-        return recomputed == self.tx_root
+        return self.merkle_tree.root == self.tx_root
 
     @property
     def header(self) -> BlockHeader:
@@ -80,25 +274,72 @@ class Block:
             tx_root=self.tx_root,
             nonce=self.nonce,
             difficulty=self.difficulty,
+            state_root=self.state_root,
         )
 
     def compute_hash(self) -> str:
         return self.header.hash()
 
-    def mine(self, log_every: int = 10_000) -> str:
-        """Proof-of-Work: find hash with '0' * difficulty prefix."""
-        target_prefix = "0" * self.difficulty
+    def pow_midstate(self) -> CustomHasher:
+        """Hasher with the fixed header prefix (prev_hash|timestamp|version|tx_root|[state_root|]) absorbed."""
+        return CustomHasher(self.header.prefix())
+
+    def hash_from_midstate(self, midstate: CustomHasher, nonce: int) -> str:
+        """Same as compute_hash() for the given nonce, but only hashes the nonce-bearing tail."""
+        return hash_to_hex(self.hash_int_from_midstate(midstate, nonce))
+
+    def hash_int_from_midstate(self, midstate: CustomHasher, nonce: int) -> int:
+        """Integer form of hash_from_midstate(); no hex string is built."""
+        h = midstate.copy()
+        h.update(f"{nonce}|{self.difficulty}")
+        return h.intdigest()
+
+    def mine(self, log_every: int = 10_000, engine: str = "python", batch_size: int = 4096) -> str:
+        """
+        Proof-of-Work: find hash with '0' * difficulty prefix.
+        engine="numpy" tests batch_size nonces per loop iteration (requires numpy).
+        """
+        if engine == "numpy":
+            return self._mine_numpy(log_every, batch_size)
+        if engine != "python":
+            raise ValueError(f"Unknown mining engine: {engine!r}")
+
+        target = pow_target(self.difficulty)
+        midstate = self.pow_midstate()
+        # nonce skaiciuojamas lokaliai – self.nonce (ir __setattr__ listener'is) priskiriamas tik radus
+        nonce = self.nonce
         attempts = 0
         while True:
-            h = self.compute_hash()
-            if h.startswith(target_prefix):
-                self.hash = h
-                return h
-            # mutate nonce (encapsulation through header rebuild via property)
-            self.nonce += 1
+            h = self.hash_int_from_midstate(midstate, nonce)
+            if h < target:
+                self.nonce = nonce
+                self.hash = hash_to_hex(h)  # hex tik priimtam blokui
+                return self.hash
+            nonce += 1
             attempts += 1
             if attempts % log_every == 0:
-                print(f"  … still mining (nonce={self.nonce}, last_hash={h[:12]}…)")
+                print(f"  … still mining (nonce={nonce}, last_hash={hash_to_hex(h)[:12]}…)")
+
+    def _mine_numpy(self, log_every: int, batch_size: int) -> str:
+        import numpy as np
+
+        midstate = self.pow_midstate()
+        suffix = f"|{self.difficulty}"
+        attempts, next_log = 0, log_every
+        nonce = self.nonce
+        while True:
+            nonces = np.arange(nonce, nonce + batch_size, dtype=np.uint64)
+            words = custom_hash256_batch_state(midstate, nonces, suffix)
+            hits = np.flatnonzero(below_target_mask(words, pow_target(self.difficulty)))
+            if hits.size:
+                self.nonce = int(nonces[hits[0]])
+                self.hash = self.hash_from_midstate(midstate, self.nonce)
+                return self.hash
+            nonce += batch_size
+            attempts += batch_size
+            if attempts >= next_log:
+                next_log += log_every
+                print(f"  … still mining (nonce={nonce})")
 
     def header_dict(self) -> dict:
         return {
@@ -106,6 +347,7 @@ class Block:
             "timestamp": self.timestamp,
             "version": self.version,
             "tx_root": self.tx_root,
+            "state_root": self.state_root,
             "nonce": self.nonce,
             "difficulty": self.difficulty,
         }
@@ -129,16 +371,86 @@ class Block:
             "hash": self.hash,
             "header": {
                 "prev_hash": self.prev_hash,
+                "timestamp": self.timestamp,
                 "version": self.version,
                 "difficulty": self.difficulty,
                 "nonce": self.nonce,
                 "tx_root": getattr(self, "tx_root", None),
+                "state_root": self.state_root,
             },
             "transactions": [tx_to_primitive(t) for t in self.transactions],
         }
 
+    @classmethod
+    def from_dict(cls, d: dict) -> "Block":
+        """Atvirkstinis to_dict(); issaugotas tx_root paliekamas, kad klastote butu aptinkama."""
+        h = d["header"]
+        block = cls(
+            index=d["index"],
+            transactions=[transaction_from_dict(t) for t in d["transactions"]],
+            prev_hash=h["prev_hash"],
+            version=h["version"],
+            difficulty=h["difficulty"],
+            timestamp=h["timestamp"],
+            nonce=h["nonce"],
+            hash=d["hash"],
+        )
+        if h.get("tx_root") is not None:
+            block.tx_root = h["tx_root"]
+        block.state_root = h.get("state_root")
+        return block
 
     def is_valid_pow(self) -> bool:
         if self.hash is None:
             return False
-        return self.hash.startswith("0" * self.difficulty) and self.hash == self.compute_hash()
+        h = self.header.hash_int()
+        return h < pow_target(self.difficulty) and self.hash == hash_to_hex(h)
+
+
+class BlockTemplate:
+    """
+    Shared candidate block for one mining round: transactions are chosen and validated once
+    and the Merkle tree is built once. Each miner only adds its own variation – a coinbase
+    (only the reserved first leaf's path is rehashed, O(log n)) or, without a coinbase, its
+    own nonce range. Miner blocks share the template's tree and transaction tuple; a coinbase
+    block needs one (coinbase,) + txs tuple, a pointer copy without hashing.
+    """
+    __slots__ = ("index", "prev_hash", "transactions", "version", "difficulty", "timestamp",
+                 "coinbase_slot", "merkle")
+
+    def __init__(self, index: int, prev_hash: str, transactions: List, version: str = "v0.1",
+                 difficulty: int = 3, coinbase_slot: bool = False, timestamp: Optional[int] = None):
+        self.index = index
+        self.prev_hash = prev_hash
+        self.transactions = tuple(transactions)
+        self.version = version
+        self.difficulty = difficulty
+        self.timestamp = int(datetime.now(timezone.utc).timestamp()) if timestamp is None else timestamp
+        self.coinbase_slot = coinbase_slot
+        # coinbase vieta rezervuojama kaip pirmas lapas; kiekvienas mineris ja tik pakeicia
+        placeholder = [custom_hash256("coinbase")] if coinbase_slot else []
+        self.merkle = MerkleTree(placeholder + [tx.tx_id for tx in self.transactions])
+
+    def block_for(self, coinbase=None, state_root: Optional[str] = None) -> Block:
+        """
+        Kandidatinis blokas vienam mineriui (su jo coinbase, jei ruosinys ja numato);
+        state_root – busenos saknis po sio bloko (account: priklauso ir nuo minerio atlygio).
+        """
+        if (coinbase is not None) != self.coinbase_slot:
+            raise ValueError("coinbase must be given exactly when the template reserves a slot for it")
+        txs, root = self.transactions, self.merkle.root
+        if coinbase is not None:
+            txs = (coinbase,) + txs
+            root = self.merkle.root_with(0, coinbase.tx_id)
+        block = Block(
+            index=self.index,
+            transactions=txs,
+            prev_hash=self.prev_hash,
+            version=self.version,
+            difficulty=self.difficulty,
+            timestamp=self.timestamp,
+            merkle=self.merkle,
+            shared_merkle_root=root,
+        )
+        block.state_root = state_root
+        return block
@@ -0,0 +1,238 @@
+"""
+block_store.py – append-only binary bloku saugykla
+---------------------------------------------------
+Kiekvienas blokas rasomas kaip vienas irasas segmento faile:
+
+    [magic 4B][payload ilgis 4B][bloko aukstis 8B][bloko hash 32B][difficulty 1B][crc32 4B][payload]
+
+payload – kompaktiskas Block.to_dict() JSON. Atidarant faila per mmap perskaitomos tik
+irasu antrastes (aukstis/hash -> offset indeksas), payload'ai parsinami tik paprasius bloka.
+Antrastes difficulty leidzia suskaiciuoti sukaupta darba neparsinant payload'u (headers()).
+StoredChain – grandines (list) vaizdas, kuris blokus parsina tik paprasius.
+Nutruke paskutinio iraso rasymas (crash) aptinkamas ir nukerpamas.
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from block import Block
+
+MAGIC = b"BLK2"
+OLD_MAGICS = (b"BLK1",)  # ankstesnis formatas (be difficulty) – nepalaikomas, bet ir nenukerpamas
+RECORD_HEADER = struct.Struct(">4sIQ32sBI")
+
+
+class BlockStore:
+    def __init__(self, path: str, fsync: bool = False, verify: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self.verify = verify  # True: crc32 tikrinamas visiems irasams, ne tik paskutiniam
+        self._offsets: List[int] = []          # aukstis -> offset
+        self._hashes: List[bytes] = []         # aukstis -> hash
+        self._difficulties: List[int] = []     # aukstis -> difficulty
+        self._by_hash: Dict[bytes, int] = {}   # hash -> aukstis
+        self.recovered_bytes = 0               # kiek nutrukusio galo nukirpta atidarant
+
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        self._file = open(path, "r+b")
+        self._mm: Optional[mmap.mmap] = None
+        self._scan()
+
+    @classmethod
+    def create(cls, path: str, fsync: bool = False) -> "BlockStore":
+        """Nauja tuscia saugykla (esamas failas perrasomas)."""
+        open(path, "wb").close()
+        return cls(path, fsync=fsync)
+
+    # --- indeksas ---
+    def _remap(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        size = os.fstat(self._file.fileno()).st_size
+        if size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _scan(self) -> None:
+        """Perskaito tik irasu antrastes; sugadinta/nutrukusi uodega nukerpama."""
+        self._remap()
+        size = len(self._mm) if self._mm is not None else 0
+        pos = 0
+        if size >= 4 and self._mm[:4] in OLD_MAGICS:
+            raise ValueError(f"BlockStore: {self.path} uses an old record format ({self._mm[:4].decode()}), "
+                             f"expected {MAGIC.decode()}")
+        while pos < size:
+            end = self._record_end(pos, size)
+            if end is None:
+                break
+            _, _, height, h, difficulty, _ = RECORD_HEADER.unpack_from(self._mm, pos)
+            self._index(pos, height, h, difficulty)
+            pos = end
+
+        if pos < size:
+            self.recovered_bytes = size - pos
+            print(f"⚠️  BlockStore: dropping torn tail ({self.recovered_bytes} bytes) in {self.path}")
+            self._mm.close()
+            self._mm = None
+            self._file.truncate(pos)
+            self._file.flush()
+            self._remap()
+
+    def _record_end(self, pos: int, size: int) -> Optional[int]:
+        if pos + RECORD_HEADER.size > size:
+            return None
+        magic, length, _, _, _, crc = RECORD_HEADER.unpack_from(self._mm, pos)
+        end = pos + RECORD_HEADER.size + length
+        if magic != MAGIC or end > size:
+            return None
+        # crc skaitomas tik paskutiniam irasui (ten gali buti nutrukes rasymas), nebent verify=True
+        if (self.verify or end == size) and zlib.crc32(self._mm[pos + RECORD_HEADER.size:end]) != crc:
+            return None
+        return end
+
+    def _index(self, offset: int, height: int, h: bytes, difficulty: int) -> None:
+        if height < len(self._offsets):
+            # tas pats aukstis irasytas dar karta (pvz. po reorg) – auksciau esantys blokai nebegalioja
+            for old in self._hashes[height:]:
+                self._by_hash.pop(old, None)
+            del self._offsets[height:], self._hashes[height:], self._difficulties[height:]
+        if height != len(self._offsets):
+            raise ValueError(f"BlockStore: gap in heights (got {height}, expected {len(self._offsets)})")
+        self._offsets.append(offset)
+        self._hashes.append(h)
+        self._difficulties.append(difficulty)
+        self._by_hash[h] = height
+
+    # --- rasymas ---
+    def append(self, block: Block) -> int:
+        """Prideda bloka i failo gala; grazina jo offset'a."""
+        payload = json.dumps(block.to_dict(), separators=(",", ":")).encode("utf-8")
+        h = bytes.fromhex(block.hash)
+        record = RECORD_HEADER.pack(
+            MAGIC, len(payload), block.index, h, block.difficulty, zlib.crc32(payload)
+        ) + payload
+
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(record)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._index(offset, block.index, h, block.difficulty)
+        return offset
+
+    def truncate(self, height: int) -> None:
+        """
+        Pasalina blokus nuo `height` (imtinai), pvz. atjungus virsune. Visi irasai po aukscio
+        `height` iraso buvo prideti veliau ir yra ne zemiau – failas tiesiog nukerpamas.
+        """
+        if height >= len(self._offsets):
+            return
+        offset = self._offsets[height]
+        for old in self._hashes[height:]:
+            self._by_hash.pop(old, None)
+        del self._offsets[height:], self._hashes[height:], self._difficulties[height:]
+        if self._mm is not None:
+            self._mm.close()  # mmap negali likti uz nukirpto failo galo
+            self._mm = None
+        self._file.truncate(offset)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._remap()
+
+    # --- skaitymas ---
+    def _read(self, offset: int) -> Block:
+        if self._mm is None or offset >= len(self._mm):
+            self._remap()  # po append'u mmap per trumpas
+        _, length, _, _, _, _ = RECORD_HEADER.unpack_from(self._mm, offset)
+        start = offset + RECORD_HEADER.size
+        return Block.from_dict(json.loads(self._mm[start:start + length]))
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def get(self, height: int) -> Block:
+        return self._read(self._offsets[height])
+
+    def get_by_hash(self, block_hash: str) -> Optional[Block]:
+        height = self._by_hash.get(bytes.fromhex(block_hash))
+        return None if height is None else self.get(height)
+
+    def tip_hash(self) -> Optional[str]:
+        """Paskutinio bloko hash be payload parsinimo."""
+        return self._hashes[-1].hex() if self._hashes else None
+
+    def headers(self) -> Iterator[Tuple[int, str, int]]:
+        """(aukstis, hash, difficulty) kiekvienam blokui – tik is antrasciu, payload'ai neparsinami."""
+        for height, (h, difficulty) in enumerate(zip(self._hashes, self._difficulties)):
+            yield height, h.hex(), difficulty
+
+    def __iter__(self) -> Iterator[Block]:
+        for height in range(len(self._offsets)):
+            yield self.get(height)
+
+    def load_chain(self) -> List[Block]:
+        return list(self)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self) -> "BlockStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class StoredChain:
+    """
+    Grandines vaizdas (list sasaja) virs BlockStore: blokai parsinami tik paprasius ir cache'inami.
+    append()/pop() keicia tik vaizda – saugykla keicia Blockchain (store.append / store.truncate).
+    """
+
+    def __init__(self, store: BlockStore):
+        self.store = store
+        self._blocks: List[Optional[Block]] = [None] * len(store)  # None – dar neparsintas
+        self._on_change = None  # kaip ChainList: kvieciamas su pakeisto aukscio numeriu
+
+    def _load(self, height: int) -> Block:
+        block = self._blocks[height]
+        if block is None:
+            block = self._blocks[height] = self.store.get(height)
+        return block
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __getitem__(self, i):
+        n = len(self._blocks)
+        if isinstance(i, slice):
+            return [self._load(h) for h in range(*i.indices(n))]
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("chain index out of range")
+        return self._load(i)
+
+    def __iter__(self) -> Iterator[Block]:
+        for height in range(len(self._blocks)):
+            yield self._load(height)
+
+    def append(self, block: Block) -> None:
+        self._blocks.append(block)
+
+    def pop(self) -> Block:
+        block = self[-1]
+        self._blocks.pop()
+        if self._on_change is not None:
+            self._on_change(len(self._blocks))
+        return block
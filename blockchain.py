@@ -1,23 +1,32 @@
-from typing import List, Dict, Optional, TYPE_CHECKING
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 if TYPE_CHECKING:
     from user import User
+    from block_store import BlockStore
 
-from block import Block
+from block import Block, BlockTemplate, pow_target, hash_to_hex
+from mempool import Mempool
+from mining import MiningJob
+from state_tree import StateTree
 from custom_hash import custom_hash256
-from transaction import Transaction, UTXOTransaction
-from user import update_balances
-from utxo import UTXOSet, TxIn, TxOut
-import time, random
+from transaction import Transaction, UTXOTransaction, mutation_count
+from user import BalanceOverlay, update_balances
+from utxo import UTXOSet, PackedUTXOSet, BlockUndo, TxIn, TxOut
+import os, queue, threading, time, random
+
+BLOCK_TX_LIMIT = 100           # daugiausia pool'o tx viename bloke (ir viename ruosinio lange)
+TEMPLATE_SCAN_LIMIT = 8 * BLOCK_TX_LIMIT  # kiek daugiausia pool'o tx perziurima vienam ruosiniui
+# atmetimo priezastys, kurios laikui begant nepasikeis – tokios tx salinamos is pool'o iskart
+PERMANENT_REJECTS = frozenset(("bad_tx_id", "unknown_party", "non_positive"))
 
 
 def validate_transactions_account_model(tx_list, users_by_key):
     """
     Pre-validate a candidate batch using the account model.
-    Checks: tx_id correctness, known parties, positive amount, and balance (on a temp snapshot).
+    Checks: tx_id correctness, known parties, positive amount, and balance (on a copy-on-write overlay).
     Returns: (valid_tx_list, rejected_list_of_(reason, tx)).
     """
     valid, rejected = [], []
-    temp_bal = {k: u.balance for k, u in users_by_key.items()}
+    temp_bal = BalanceOverlay(users_by_key)  # tik paliestos paskyros, niekada necommit'inama
 
     for tx in tx_list:
         if not getattr(tx, "verify_id", None) or not tx.verify_id():
@@ -31,11 +40,10 @@ def validate_transactions_account_model(tx_list, users_by_key):
         if tx.amount <= 0:
             rejected.append(("non_positive", tx))
             continue
-        if temp_bal[tx.sender] < tx.amount:
+        if temp_bal.balance(tx.sender) < tx.amount:
             rejected.append(("insufficient", tx))
             continue
-        temp_bal[tx.sender] -= tx.amount
-        temp_bal[tx.receiver] += tx.amount
+        temp_bal.transfer(tx.sender, tx.receiver, tx.amount)
         valid.append(tx)
 
     return valid, rejected
@@ -52,7 +60,7 @@ def validate_transactions_utxo(tx_list, utxo_set: UTXOSet):
     Grazina: (valid_list, rejected_list_of_(reason, tx))
     """
     valid, rejected = [], []
-    temp = utxo_set.copy()
+    temp = utxo_set.overlay()  # delta sluoksnis, bazinis rinkinys nekopijuojamas
 
     for tx in tx_list:
         # id verifikacija
@@ -109,13 +117,16 @@ def apply_block_utxo(block, utxo_set: UTXOSet):
     """
     Po laimetu bloko mining coinu pritaikom tx i realu UTXO rinkini.
     Coinbase leidziamas (inputs tuscias).
+    Pakeitimai kaupiami sluoksnyje ir pritaikomi vienu commit().
+    Grazina: (applied, skipped, undo) – undo skirtas disconnect_block_utxo().
     """
     applied, skipped = 0, 0
+    view = utxo_set.overlay()
     for tx in block.transactions:
         if isinstance(tx, UTXOTransaction) and len(tx.inputs) == 0:
             # coinbase
             for idx, o in enumerate(tx.outputs):
-                utxo_set.add_output(tx.tx_id, idx, o)
+                view.add_output(tx.tx_id, idx, o)
             applied += 1
             continue
 
@@ -126,7 +137,7 @@ def apply_block_utxo(block, utxo_set: UTXOSet):
         # privalo egzistuoti visi inputai
         ok = True
         for tin in tx.inputs:
-            if not utxo_set.has(tin):
+            if not view.has(tin):
                 ok = False
                 break
         if not ok:
@@ -135,20 +146,161 @@ def apply_block_utxo(block, utxo_set: UTXOSet):
 
         # spend + add
         for tin in tx.inputs:
-            utxo_set.spend(tin)
+            view.spend(tin)
         for idx, o in enumerate(tx.outputs):
-            utxo_set.add_output(tx.tx_id, idx, o)
+            view.add_output(tx.tx_id, idx, o)
         applied += 1
-    return applied, skipped
+    undo = view.commit()
+    return applied, skipped, undo
+
+
+def disconnect_block_utxo(undo: BlockUndo, utxo_set) -> None:
+    """Atstato UTXO rinkini i busena pries apply_block_utxo; kaina O(bloko dydis)."""
+    for txin in undo.created:
+        utxo_set.spend(txin)
+    for txin, out in undo.spent:
+        utxo_set.add_output(txin.prev_tx_id, txin.prev_index, out)
+
+
+def _process_miner_worker(slot, block, start, step, deadline, found_event, results):
+    """Proceso darbininkas: tikrina nonce start, start + step, ... iki deadline arba kol kitas ras."""
+    target = pow_target(block.difficulty)
+    midstate = block.pow_midstate()
+    nonce = start
+    attempts = 0
+    while True:
+        h = block.hash_int_from_midstate(midstate, nonce)
+        if h < target:
+            found_event.set()
+            results.put((slot, nonce, hash_to_hex(h)))
+            return
+        nonce += step
+        attempts += 1
+        # Event/laiko tikrinimas kainuoja sistemini kvietima, todel ne kiekviena karta
+        if attempts % 256 == 0 and (found_event.is_set() or time.time() >= deadline):
+            return
+
+
+def _check_block_standalone(block, height: int, full: bool) -> bool:
+    """Patikrinimai, kuriems nereikia kaimyniniu bloku (todel tinka procesu baseinui)."""
+    # genesis hash nekasamas, todel PoW tikrinamas tik nuo 1 aukscio
+    if height > 0 and not block.is_valid_pow():
+        return False
+    if full:
+        if not block.verify_merkle_root():
+            return False
+        if not all(tx.verify_id() for tx in block.transactions):
+            return False
+    return True
+
+
+class ChainList(list):
+    """
+    Pagrindine grandine kaip list, kuris apie pakeitimus jau esamuose aukstuose (priskyrimas,
+    trynimas, iterpimas, pop...) pranesa _on_change(zemiausias_aukstis) – Blockchain juo nuleidzia
+    checkpoint'a. append/extend esamu auksciu nekeicia, todel nepranesa.
+    """
+    __slots__ = ("_on_change",)
+
+    def __init__(self, blocks=(), on_change=None):
+        super().__init__(blocks)
+        self._on_change = on_change
+
+    def _changed(self, height: int) -> None:
+        if self._on_change is not None:
+            self._on_change(height)
+
+    def _height(self, i) -> int:
+        n = len(self)
+        if isinstance(i, slice):
+            r = range(*i.indices(n))
+            return min(r) if len(r) else min(i.indices(n)[0], n)
+        return min(max(i + n if i < 0 else i, 0), n)
+
+    def __setitem__(self, i, value):
+        super().__setitem__(i, value)
+        self._changed(self._height(i))
+
+    def __delitem__(self, i):
+        height = self._height(i)
+        super().__delitem__(i)
+        self._changed(height)
+
+    def insert(self, i, value):
+        height = self._height(i)
+        super().insert(i, value)
+        self._changed(height)
+
+    def pop(self, i=-1):
+        height = self._height(i)
+        value = super().pop(i)
+        self._changed(height)
+        return value
+
+    def remove(self, value):
+        height = self.index(value)
+        super().remove(value)
+        self._changed(height)
+
+    # pertvarko visa sarasa – checkpoint'as numetamas
+    def clear(self):
+        super().clear()
+        self._changed(0)
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed(0)
+
+    def reverse(self):
+        super().reverse()
+        self._changed(0)
+
+    def __imul__(self, n):
+        result = super().__imul__(n)
+        self._changed(0)
+        return result
 
 
 class Blockchain:
-    def __init__(self, difficulty: int = 3, version: str = "v0.1", mode: str = "account"):
+    def __init__(
+        self, difficulty: int = 3, version: str = "v0.1", mode: str = "account",
+        store: Optional["BlockStore"] = None, utxo_backend: str = "dict",
+    ):
         self.difficulty = difficulty
         self.version = version
         self.mode = mode  # "account" arba "utxo"
-        self.chain: List[Block] = []
-        self.utxo: UTXOSet | None = UTXOSet() if mode == "utxo" else None
+        self.chain = []  # ChainList (arba StoredChain po from_store) – zr. chain setter'i
+        self.store = store  # jei nurodyta, kiekvienas priimtas blokas iskart irasomas i disko faila
+        # utxo_backend="packed": kompaktiskas PackedUTXOSet (ta pati sasaja, maziau atminties)
+        utxo_cls = PackedUTXOSet if utxo_backend == "packed" else UTXOSet
+        self.utxo: UTXOSet | PackedUTXOSet | None = utxo_cls() if mode == "utxo" else None
+        # UTXO undo irasai pagal bloko hash (bloko atjungimui be perskaiciavimo nuo genesis)
+        self.utxo_undo: Dict[str, BlockUndo] = {}
+        # Account undo: pritaikytos tx pagal bloko hash; atlygis (miner, suma) pagal bloko hash
+        self.account_undo: Dict[str, list] = {}
+        self.block_rewards: Dict[str, tuple] = {}
+        # per reorg atjungtu bloku tx, kuriu nera naujoje sakoje (kai add_block nepaduotas tx_pool)
+        self.orphaned_txs: list = []
+        self.users_by_key: Optional[dict] = None  # account busena (nustatoma mine_next_block)
+        # Account busenos Merkle medis (kuriamas pirmaji karta prijungiant bloka su users_by_key)
+        self.state_tree: Optional[StateTree] = None
+        # grandines keitimai (add_block, kasimo rezultato prijungimas) – po sia spyna, kad foninis
+        # MiningJob ir mazgo gija galetu dirbti kartu
+        self.lock = threading.RLock()
+        # Bloku medis: visi zinomi blokai (ir soninės sakos) + sukauptas darbas iki kiekvieno
+        self.blocks: Dict[str, Block] = {}
+        self.cumulative_work: Dict[str, int] = {}
+        # Pagrindines grandines indeksai (palaikomi prijungiant/atjungiant blokus)
+        self.height_by_hash: Dict[str, int] = {}
+        self.tx_index: Dict[bytes, Tuple[int, int]] = {}        # tx_id_bytes -> (height, pozicija bloke)
+        self.address_index: Dict[str, List[Tuple[int, int]]] = {}  # adresas -> [(height, pozicija)]
+        self._tx_indexed = True  # False po from_store: tx/adresu indeksai statomi per pirma uzklausa
+        # (height, hash, full): viskas iki height imtinai jau patikrinta
+        self._checkpoint: Optional[tuple] = None
+        # pilnam checkpoint'ui: kiekvieno patikrinto bloko tx id ir tx pakeitimu skaitliukas tuo metu
+        # (tx turinio keitimas vietoje Block listener'io nepasiekia)
+        self._checkpoint_txs: List[tuple] = []
+        self._checkpoint_mutations = 0
 
     def create_genesis_block(self) -> Block:
         """Genesis with empty tx list, prev_hash of 64 zeros."""
@@ -163,6 +315,10 @@ class Blockchain:
         # padarom genezini hash deterministini
         genesis.hash = genesis.compute_hash()
         self.chain.append(genesis)
+        self._register(genesis, None)
+        self._index_block(genesis)
+        if self.store is not None:
+            self.store.append(genesis)
         print(f"✅ Genesis block created: idx=0, hash={genesis.hash[:12]}…, tx=0")
         return genesis
 
@@ -180,27 +336,388 @@ class Blockchain:
             # viena output i savininka su pilnu balansu
             self.utxo.add_output(fake_txid, 0, TxOut(amount=u.balance, receiver=pk))
 
+    @classmethod
+    def from_store(cls, store: "BlockStore", mode: str = "account",
+                   users_by_key: Optional[dict] = None) -> "Blockchain":
+        """
+        Atstato grandine is BlockStore; tolesni add_block rasys i ta pacia saugykla.
+        Parsinamas tik genesis (difficulty/version); sukauptas darbas ir height_by_hash
+        skaiciuojami is irasu antrasciu, kiti blokai parsinami tik paprasius (StoredChain).
+        users_by_key (account): busena po virsunes bloko – is jos atstatomas state_tree ir
+        palyginamas su virsunes issaugotu state_root.
+        """
+        from block_store import StoredChain
+
+        chain = StoredChain(store)
+        genesis = chain[0] if len(chain) else None
+        bc = cls(
+            difficulty=genesis.difficulty if genesis else 3,
+            version=genesis.version if genesis else "v0.1",
+            mode=mode,
+            store=store,
+        )
+        bc.chain = chain
+        work = 0
+        for height, block_hash, difficulty in store.headers():
+            work += 16 ** difficulty  # kaip block_work()
+            bc.cumulative_work[block_hash] = work
+            bc.height_by_hash[block_hash] = height
+        bc._tx_indexed = False
+        if users_by_key is not None and mode == "account":
+            bc.users_by_key = users_by_key
+            bc.state_tree = StateTree.from_users(users_by_key)
+            saved = bc.last_block.state_root if genesis else None
+            if saved is not None and saved != bc.state_tree.root:
+                print(f"⚠️  State root mismatch: tip #{bc.last_block.index} saved {saved[:16]}…, "
+                      f"balances give {bc.state_tree.root[:16]}…")
+        return bc
+
+    @property
+    def chain(self) -> List[Block]:
+        return self._chain
+
+    @chain.setter
+    def chain(self, blocks) -> None:
+        """Priskirta grandine apvyniojama ChainList, kad jos keitimas pasiektu checkpoint'a."""
+        if not hasattr(blocks, "_on_change"):  # ChainList / StoredChain jau turi
+            blocks = ChainList(blocks)
+        blocks._on_change = self._chain_changed
+        self._chain = blocks
+        self._checkpoint = None
+
     @property
     def last_block(self) -> Optional[Block]:
         return self.chain[-1] if self.chain else None
 
-    def add_block(self, block: Block) -> bool:
-        """Validate full block before appending."""
-        prev = self.last_block
+    @staticmethod
+    def block_work(block: Block) -> int:
+        """Tiketinas hash bandymu skaicius blokui su tokiu difficulty."""
+        return 16 ** block.difficulty
+
+    def _register(self, block: Block, prev: Optional[Block]) -> None:
+        """Ideda bloka i medi ir apskaiciuoja sukaupta darba."""
+        prev_work = 0
+        if prev is not None:
+            if prev.hash not in self.cumulative_work:  # pvz. grandine sudeta ranka (tamper_test)
+                self._register(prev, self._known_block(prev.prev_hash))
+            prev_work = self.cumulative_work[prev.hash]
+        self.blocks[block.hash] = block
+        self.cumulative_work[block.hash] = prev_work + self.block_work(block)
+
+    def _known_block(self, block_hash: str) -> Optional[Block]:
+        """Bloku medzio paieska; is saugyklos ikelti pagrindines grandines blokai nelaikomi self.blocks."""
+        block = self.blocks.get(block_hash)
+        if block is None:
+            block = self.get_block_by_hash(block_hash)
+        return block
+
+    def add_block(self, block: Block, tx_pool: "list | Mempool | None" = None) -> bool:
+        """
+        Validate full block before accepting it into the block tree.
+        Tip'o pratesimas prijungiamas iskart; blokas kitoje sakoje saugomas medyje,
+        o jei ta saka tampa sunkiausia (daugiau sukaupto darbo) – daroma reorganizacija.
+        True reiskia "priimtas i medi" – ar blokas tapo virsune, rodo self.last_block is block.
+        Reorg metu atjungtu bloku tx, kuriu nera naujoje sakoje, grazinamos i tx_pool
+        (jei nepaduotas – kaupiamos self.orphaned_txs).
+        """
+        with self.lock:
+            return self._add_block(block, tx_pool)
+
+    def _return_to_pool(self, disconnected: List[Block], connected: List[Block], tx_pool) -> None:
+        """
+        Po reorg: atjungtu bloku tx (be coinbase), kuriu nera prijungtoje sakoje, grazinamos i pool'a,
+        o prijungtos sakos tx is jo pasalinamos.
+        """
+        in_branch = {tx.tx_id_bytes for b in connected for tx in b.transactions}
+        txs = [
+            tx for b in reversed(disconnected) for tx in b.transactions
+            if tx.tx_id_bytes not in in_branch and not (isinstance(tx, UTXOTransaction) and not tx.inputs)
+        ]
+        if tx_pool is None:
+            self.orphaned_txs.extend(txs)
+        elif isinstance(tx_pool, Mempool):
+            tx_pool.remove(in_branch)
+            for tx in txs:
+                tx_pool.add(tx)
+        else:
+            tx_pool[:] = [tx for tx in tx_pool if tx.tx_id_bytes not in in_branch]
+            known = {tx.tx_id_bytes for tx in tx_pool}
+            tx_pool.extend(tx for tx in txs if tx.tx_id_bytes not in known)
+
+    def _add_block(self, block: Block, tx_pool=None) -> bool:
+        tip = self.last_block
+        if block.hash in self.cumulative_work:
+            print("ℹ️  Block already known.")
+            return False
+        extends_tip = tip is None or block.prev_hash == tip.hash
+        prev = tip if extends_tip else self._known_block(block.prev_hash)
+        if prev is None:
+            print("❌ Block verification failed: unknown parent (orphan).")
+            return False
         if not self.verify_block(block, prev):
             print("❌ Block verification failed.")
             return False
+        if block.index != prev.index + 1:
+            print("❌ Block verification failed: index does not follow parent.")
+            return False
 
-        self.chain.append(block)
+        self._register(block, prev)
+        try:
+            if not extends_tip:
+                if self.cumulative_work[block.hash] > self.cumulative_work[tip.hash]:
+                    disconnected, connected = self.reorganize(block)
+                    self._return_to_pool(disconnected, connected, tx_pool)
+                    print(f"🔀 Reorg: disconnected {len(disconnected)}, connected {len(connected)} blocks "
+                          f"(new tip #{block.index})")
+                else:
+                    print(f"ℹ️  Block #{block.index} stored on a side branch (less work than tip).")
+                return True
+            applied, skipped = self._connect_block(block)
+        except Exception as e:
+            # busena/grandine jau atstatyta (reorganize) – blokas pamirstamas, kad ji butu galima pateikti vel
+            self.blocks.pop(block.hash, None)
+            self.cumulative_work.pop(block.hash, None)
+            print(f"❌ Block #{block.index} could not be connected: {e}")
+            return False
 
         print(
             f"   merkle_root={block.tx_root[:16]}… "
             f"tx_count={len(block.transactions)} "
             f"pow_ok={block.is_valid_pow()} "
-            f"merkle_ok={block.verify_merkle_root()}"
+            f"merkle_ok={block.verify_merkle_root()} "
+            f"applied={applied} skipped={skipped}"
         )
         return True
 
+    def reorganize(self, new_tip: Block) -> Tuple[List[Block], List[Block]]:
+        """
+        Perjungia pagrindine grandine i saka, kurios virsune new_tip.
+        Atjungiama ir prijungiama tik issiskyrusi dalis (nuo bendro protevio).
+        Grazina (atjungti_blokai, prijungti_blokai) – atjungtu tx galima grazinti i pool'a.
+        Jei atjungti/prijungti nepavyksta, grazinama ankstesne grandine ir isimtis keliama toliau.
+        """
+        branch = []
+        b = new_tip
+        while not (b.index < len(self.chain) and self.chain[b.index].hash == b.hash):
+            branch.append(b)
+            b = self._known_block(b.prev_hash)
+        fork_height = b.index
+        branch.reverse()
+
+        disconnected = []
+        try:
+            while len(self.chain) - 1 > fork_height:
+                disconnected.append(self.disconnect_tip())
+            for block in branch:
+                self._connect_block(block)
+        except Exception:
+            branch_hashes = {block.hash for block in branch}
+            while len(self.chain) - 1 > fork_height and self.chain[-1].hash in branch_hashes:
+                self.disconnect_tip()
+            for block in reversed(disconnected):
+                self._connect_block(block)
+            raise
+        return disconnected, branch
+
+    def _connect_block(self, block: Block) -> Tuple[int, int]:
+        """Prijungia bloka prie virsunes: busena (su undo), indeksai, saugykla. Grazina (applied, skipped)."""
+        counts = self._connect_state(block)
+        self.chain.append(block)
+        self._index_block(block)
+        if self.store is not None:
+            self.store.append(block)
+        return counts
+
+    def _connect_state(self, block: Block) -> Tuple[int, int]:
+        """Pritaiko bloko busenos pakeitimus (UTXO arba balansai) ir issaugo undo irasa."""
+        if self.mode == "utxo":
+            applied, skipped, self.utxo_undo[block.hash] = apply_block_utxo(block, self.utxo)
+            return applied, skipped
+        if self.users_by_key is None:
+            return 0, 0
+        if self.state_tree is None:
+            self.state_tree = StateTree.from_users(self.users_by_key)
+        applied_txs = []
+        applied, skipped = update_balances(block.transactions, self.users_by_key, applied_out=applied_txs)
+        reward = self.block_rewards.get(block.hash)
+        if reward is not None:
+            miner, amount = reward
+            miner.balance += amount
+        self.account_undo[block.hash] = applied_txs
+        self._update_state_tree(applied_txs, reward)
+        if block.state_root is not None and block.state_root != self.state_tree.root:
+            self._disconnect_state(block)  # atstatom balansus ir medi, blokas atmetamas
+            raise ValueError(f"Block #{block.index} state_root mismatch")
+        return applied, skipped
+
+    def _template_state_roots(self, txs, miners: list, reward: int) -> List[Optional[str]]:
+        """
+        Busenos saknis po ruosinio bloko kiekvienam mineriui (account): tx pritaikomos viena karta
+        (BalanceOverlay -> laikinai i state_tree), mineriui tik pridedamas atlygis – O(gylis) per mineri.
+        """
+        if self.users_by_key is None:
+            return [None] * len(miners)
+        with self.lock:
+            if self.state_tree is None:
+                self.state_tree = StateTree.from_users(self.users_by_key)
+            overlay = BalanceOverlay(self.users_by_key)
+            for tx in txs:  # ruosinio tx jau patikrintos validate_transactions_account_model
+                overlay.transfer(tx.sender, tx.receiver, tx.amount)
+            balances = {pk: overlay.balance(pk) for pk in overlay.touched()}
+            with self.state_tree.applied(balances.items()) as tree:
+                # kaip _connect_state: atlygis pridedamas minerio objektui (jis gali buti ne users_by_key)
+                return [tree.root_with([(m.public_key, balances.get(m.public_key, m.balance) + reward)])
+                        for m in miners]
+
+    def _update_state_tree(self, applied_txs: list, reward: Optional[tuple]) -> None:
+        """Medyje atnaujinamos tik bloko paliestos paskyros."""
+        touched = {}
+        for tx in applied_txs:
+            touched[tx.sender] = self.users_by_key[tx.sender]
+            touched[tx.receiver] = self.users_by_key[tx.receiver]
+        if reward is not None:
+            touched[reward[0].public_key] = reward[0]
+        self.state_tree.update((pk, u.balance) for pk, u in touched.items())
+
+    def _disconnect_state(self, block: Block) -> None:
+        if self.mode == "utxo":
+            undo = self.utxo_undo.pop(block.hash, None)
+            if undo is None:
+                raise ValueError(f"No UTXO undo record for block #{block.index}")
+            disconnect_block_utxo(undo, self.utxo)
+            return
+        if self.users_by_key is None:
+            return
+        applied_txs = self.account_undo.pop(block.hash, None)
+        if applied_txs is None:  # pvz. blokas ikeltas is saugyklos – ju busena jau balansuose
+            raise ValueError(f"No account undo record for block #{block.index}")
+        reward = self.block_rewards.get(block.hash)
+        if reward is not None:
+            miner, amount = reward
+            miner.balance -= amount
+        for tx in reversed(applied_txs):
+            self.users_by_key[tx.sender].balance += tx.amount
+            self.users_by_key[tx.receiver].balance -= tx.amount
+        if self.state_tree is not None:
+            self._update_state_tree(applied_txs, reward)
+
+    @property
+    def state_root(self) -> Optional[str]:
+        """
+        Dabartines account busenos saknis (O(1) palyginimui tarp mazgu). Kol state_tree nera
+        (pvz. ikelta is saugyklos be balansu) – virsunes bloko issaugota saknis; None, jei busenos nera.
+        """
+        if self.state_tree is not None:
+            return self.state_tree.root
+        return self.last_block.state_root if self.chain else None
+
+    def balance_proof(self, public_key: str) -> Tuple[int, List[str], str]:
+        """(balansas, irodymas, saknis) – tikrinama per state_tree.verify_balance_proof."""
+        if self.state_tree is None or public_key not in self.state_tree:
+            raise KeyError(f"no account state for {public_key[:8]}…")
+        return self.state_tree.balance(public_key), self.state_tree.proof(public_key), self.state_tree.root
+
+    def disconnect_tip(self) -> Optional[Block]:
+        """
+        Atjungia paskutini bloka: busena atstatoma is undo iraso (O(bloko dydis)).
+        Jei prijungta saugykla, blokas pasalinamas ir is jos (po restart'o nebegrizta).
+        Blokas lieka medyje. Grazina atjungta bloka (jo transakcijas galima grazinti i pool'a) arba None.
+        """
+        if len(self.chain) <= 1:
+            return None
+        block = self.chain[-1]
+        self._disconnect_state(block)
+        self._unindex_block(block)
+        self.chain.pop()
+        if self.store is not None:
+            self.store.truncate(block.index)
+        self._invalidate_checkpoint(block)
+        return block
+
+    # --- indeksai ir uzklausos ---
+    def _tx_addresses(self, tx) -> set:
+        """Adresai, kuriuos liecia tx: account – siuntejas ir gavejas; UTXO – outputu gavejai ir inputu savininkai."""
+        if not isinstance(tx, UTXOTransaction):
+            return {tx.sender, tx.receiver}
+        addrs = {o.receiver for o in tx.outputs}
+        for tin in tx.inputs:
+            found = self.find_tx(tin.prev_tx_id)
+            if found is not None and tin.prev_index < len(found[1].outputs):
+                addrs.add(found[1].outputs[tin.prev_index].receiver)
+        return addrs
+
+    def _index_block(self, block: Block) -> None:
+        height = block.index
+        self.height_by_hash[block.hash] = height
+        if not self._tx_indexed:
+            return
+        for pos, tx in enumerate(block.transactions):
+            self.tx_index[tx.tx_id_bytes] = (height, pos)
+            for addr in self._tx_addresses(tx):
+                self.address_index.setdefault(addr, []).append((height, pos))
+
+    def _unindex_block(self, block: Block) -> None:
+        """Atvirkstine _index_block; blokas turi buti grandines virsune."""
+        height = block.index
+        self.height_by_hash.pop(block.hash, None)
+        if not self._tx_indexed:
+            return
+        for tx in block.transactions:
+            for addr in self._tx_addresses(tx):
+                entries = self.address_index.get(addr)
+                while entries and entries[-1][0] == height:
+                    entries.pop()
+                if not entries:
+                    self.address_index.pop(addr, None)
+        for tx in block.transactions:
+            if self.tx_index.get(tx.tx_id_bytes, (None,))[0] == height:
+                del self.tx_index[tx.tx_id_bytes]
+
+    def rebuild_indexes(self) -> None:
+        """Perskaiciuoja indeksus is self.chain (pvz. po ikelimo); vienas perejimas per grandine."""
+        self._tx_indexed = True
+        self.height_by_hash.clear()
+        self.tx_index.clear()
+        self.address_index.clear()
+        for block in self.chain:
+            self._index_block(block)
+
+    def _ensure_tx_index(self) -> None:
+        if not self._tx_indexed:  # po from_store: pirmoji uzklausa perskaito visa grandine
+            self.rebuild_indexes()
+
+    def get_block_by_hash(self, block_hash: str) -> Optional[Block]:
+        height = self.height_by_hash.get(block_hash)
+        return None if height is None else self.chain[height]
+
+    @staticmethod
+    def _tx_key(tx_id: "str | bytes") -> Optional[bytes]:
+        """tx_index raktas; hex paverciamas tik cia (ne hex eilute – tokios tx nera)."""
+        if isinstance(tx_id, bytes):
+            return tx_id
+        try:
+            return bytes.fromhex(tx_id)
+        except ValueError:
+            return None
+
+    def find_tx(self, tx_id: "str | bytes") -> Optional[Tuple[Block, object]]:
+        """(blokas, tx) pagrindineje grandineje arba None; tx_id – hex arba bytes."""
+        self._ensure_tx_index()
+        loc = self.tx_index.get(self._tx_key(tx_id))
+        if loc is None:
+            return None
+        block = self.chain[loc[0]]
+        return block, block.transactions[loc[1]]
+
+    def confirmations(self, tx_id: "str | bytes") -> int:
+        self._ensure_tx_index()
+        loc = self.tx_index.get(self._tx_key(tx_id))
+        return 0 if loc is None else len(self.chain) - loc[0]
+
+    def txs_for_address(self, address: str) -> list:
+        self._ensure_tx_index()
+        return [self.chain[h].transactions[p] for h, p in self.address_index.get(address, ())]
+
     def verify_block(self, block: Block, prev_block: Optional[Block]) -> bool:
         if prev_block and block.prev_hash != prev_block.hash:
             print("❌ verify_block: prev_hash mismatch")
@@ -220,16 +737,58 @@ class Blockchain:
 
     def mine_next_block(
         self,
-        tx_pool: list,
+        tx_pool: "list | Mempool",
         users_by_key: dict,
         remove_from_pool: callable,
         miners: list,
         block_reward: int = 50,
         mining_time_limit: int = 5,
+        engine: str = "thread",
+        workers: Optional[int] = None,
     ):
-        """Simulate decentralized mining competition with parallel threads"""
-        import threading
+        """
+        Simulate decentralized mining competition.
+        engine="thread"  – viena gija kiekvienam mineriui (GIL: dalinasi vienu branduoliu)
+        engine="process" – procesu baseinas, nonce intervalai padalinti tarp `workers` procesu
+        """
+        if engine not in ("thread", "process"):
+            raise ValueError(f"Unknown mining engine: {engine!r}")
+        candidates = self._round_candidates(tx_pool, users_by_key, remove_from_pool, miners, block_reward)
+        if not candidates:
+            return None
+
+        print(f"\nStarting parallel mining round with {len(miners)} miners "
+              f"({len(tx_pool)} pending tx, diff={self.difficulty})")
+        print(f"   Each miner works for {mining_time_limit}s window...")
+
+        if engine == "process":
+            result_holder = self._mine_with_processes(candidates, mining_time_limit, workers)
+        else:
+            result_holder = self._mine_with_threads(candidates, mining_time_limit)
+
+        if not result_holder:
+            print("TIMES UP: No miner found a valid hash within time window.")
+            return None
+        return self._accept_mined(*result_holder[0], block_reward, remove_from_pool, tx_pool)
+
+    def start_mining(
+        self,
+        tx_pool: "list | Mempool",
+        users_by_key: dict,
+        remove_from_pool: callable,
+        miners: list,
+        block_reward: int = 50,
+        time_limit: Optional[float] = None,
+    ) -> MiningJob:
+        """
+        Neblokuojantis kasimas: grazina MiningJob (poll/cancel/result), kuris dirba fonineje gijoje.
+        Ruosinys perstatomas, kai pasikeicia tip'as arba iskvieciamas job.refresh().
+        """
+        return MiningJob(self, tx_pool, users_by_key, remove_from_pool, miners, block_reward, time_limit)
 
+    def _round_candidates(self, tx_pool, users_by_key, remove_from_pool, miners, block_reward) -> Optional[list]:
+        """Vieno raundo kandidatai [(miner, block, start_nonce, step)] is bendro ruosinio; None – nera ka kasti."""
+        self.users_by_key = users_by_key
         if not self.chain:  # first block in chain
             self.create_genesis_block()
 
@@ -242,150 +801,309 @@ class Blockchain:
             print("No transactions to mine.")
             return None
 
-        # 1) Paruošiam candidate blocks
+        # 1) Vienas bendras ruosinys: tx parenkamos, tikrinamos ir Merkle medis statomas viena karta
+        template = self._build_template(tx_pool, users_by_key, remove_from_pool, block_index, prev_hash)
         candidates = []
-        for miner in miners:
+        if template is not None:
+            if self.mode != "utxo":
+                fees = sum(getattr(tx, "fee", 0) for tx in template.transactions)
+                roots = self._template_state_roots(template.transactions, miners, block_reward + fees)
+            for slot, miner in enumerate(miners):
+                if self.mode == "utxo":
+                    # UTXO: coinbase -> miner gauna block_reward i nauja TxOut; skirtinga coinbase = skirtinga antraste
+                    coinbase = UTXOTransaction(
+                        inputs=[],  # coinbase neturi inputu
+                        outputs=[TxOut(amount=block_reward, receiver=miner.public_key)]
+                    )
+                    candidates.append((miner, template.block_for(coinbase), 0, 1))
+                else:
+                    # ACCOUNT: antrastes skiriasi tik state_root (atlygis kitam mineriui), o jei mineris
+                    # kartojasi – ir ji sutampa, todel nonce vis tiek dalijami (slot, slot + N, ...)
+                    candidates.append((miner, template.block_for(state_root=roots[slot]), slot, num_miners))
+
+        if not candidates:
+            # UTXO: tiesiog praleidziam raunda; ACCOUNT: _build_template jau pranese priezasti
             if self.mode == "utxo":
-                # UTXO: coinbase -> miner gauna block_reward i nauja TxOut (pool nereikalingas)
-                coinbase = UTXOTransaction(
-                    inputs=[],  # coinbase neturi inputu
-                    outputs=[TxOut(amount=block_reward, receiver=miner.public_key)]
-                )
-                utxo_tx_list = [coinbase]
+                print("No UTXO candidates this round.")
+            return None
+        return candidates
 
-                valid, rejected = validate_transactions_utxo(utxo_tx_list, self.utxo)
-                if rejected:
-                    print(f"ℹ️  UTXO candidate filtering: {len(valid)} valid, {len(rejected)} rejected.")
-                if not valid:
-                    continue
+    def _accept_mined(self, miner, block: Block, found_nonce: int, found_hash: str,
+                      block_reward: int, remove_from_pool: callable, tx_pool=None) -> Optional[Block]:
+        """
+        Rasta nonce -> blokas validuojamas, prijungiamas, busena pritaikoma, tx salinamos is pool'o.
+        Jei blokas netapo virsune (pvz. kita gija jau prijunge konkurento bloka), grazinamas None
+        ir pool'as nekeiciamas.
+        """
+        with self.lock:
+            block.nonce = found_nonce
+            block.hash = found_hash
 
-                txs = valid  # coinbase-only
+            print(f"Miner {miner.name} mined block #{block.index}!")
+            print(f"   hash={found_hash[:16]}…  nonce={block.nonce}")
 
+            # 4) Account atlygis registruojamas pries prijungima – add_block ji pritaiko kartu su tx
+            #    (ir atsaukia per reorg)
+            fees = sum(getattr(tx, "fee", 0) for tx in block.transactions)
+            if self.mode == "account":
+                self.block_rewards[block.hash] = (miner, block_reward + fees)
+
+            # 5) Validate, append and apply state
+            if not self.add_block(block, tx_pool):
+                self.block_rewards.pop(block.hash, None)
+                print("Block failed chain validation.")
+                return None
+            if self.last_block is not block:
+                # liko soninej sakoje: atlygis lieka (prireiks, jei saka taps pagrindine), tx – pool'e
+                print(f"ℹ️  Mined block #{block.index} did not become the tip; pool left unchanged.")
+                return None
+
+            if self.mode == "utxo":
+                # UTXO mode: is pool'o salinam tik ne-coinbase (coinbase niekada nebuvo poole)
+                mined_non_coinbase = [
+                    t for t in block.transactions
+                    if not (isinstance(t, UTXOTransaction) and len(t.inputs) == 0)
+                ]
+                remove_from_pool(mined_non_coinbase)
             else:
-                # ACCOUNT model: imu is tx_pool
-                sample_size = min(100, len(tx_pool))
-                if sample_size == 0:
-                    continue
-                tx_batch = random.sample(tx_pool, sample_size)
+                remove_from_pool(block.transactions)
 
-                valid, rejected = validate_transactions_account_model(tx_batch, users_by_key)
-                if rejected:
-                    print(f"ℹ️  Candidate filtering: {len(valid)} valid, {len(rejected)} rejected (balance/tx_id).")
-                if not valid:
-                    continue
+            # 6) Laimejes mineris gauna coins (account mode – jau pritaikyta _connect_state)
+            if self.mode == "account":
+                print(f"Miner reward: {block_reward} + {fees} fees = {block_reward + fees} coins")
+            else:
+                # UTXO mode – atlygis jau iskeltas i coinbase TxOut
+                print(f"Miner reward paid via coinbase output: {block_reward} coins")
 
-                txs = valid[:100]
+            print(f"Block #{block.index} added. Chain length = {len(self.chain)}")
+            return block
 
-            block = Block(
-                index=block_index,
-                transactions=txs,
-                prev_hash=prev_hash,
-                version=self.version,
-                difficulty=self.difficulty,
-            )
-            candidates.append((miner, block))
+    @staticmethod
+    def _select_from_pool(tx_pool, n: int, skip: int = 0) -> list:
+        """
+        Mempool: n auksciausio prioriteto tx (fee, amzius), praleidus `skip` pirmuju.
+        Paprastas sarasas prioriteto neturi – tada atsitiktine imtis (skip nenaudojamas).
+        """
+        if isinstance(tx_pool, Mempool):
+            return tx_pool.select(n, skip)
+        return random.sample(list(tx_pool), min(n, len(tx_pool)))
 
-        if not candidates:
-            # UTXO: nereik pooolo revalidacijos, tiesiog praleidziam raunda
-            if self.mode == "utxo":
-                print("No UTXO candidates this round.")
-                return None
-            else:
-                # ACCOUNT: Pertikrinam visa pool'a, gal liko tik blogos tx
-                valid_all, rejected_all = validate_transactions_account_model(tx_pool, users_by_key)
-                if not valid_all and rejected_all:
-                    invalid = [tx for (_, tx) in rejected_all]
-                    print(
-                        f"⚠️  All remaining {len(tx_pool)} tx are invalid "
-                        f"({len(invalid)} rejected). Dropping them and ending mining."
-                    )
-                    remove_from_pool(invalid)
-                return None
+    def _build_template(self, tx_pool, users_by_key, remove_from_pool, block_index: int,
+                        prev_hash: str) -> Optional[BlockTemplate]:
+        """
+        Parenka ir patikrina raundo transakcijas viena karta visiems mineriams.
+        Account: langai po BLOCK_TX_LIMIT pagal prioriteta; jei lange nera galiojanciu tx, jis
+        praleidziamas (is viso ne daugiau TEMPLATE_SCAN_LIMIT tx, ne visas pool'as).
+        Visam laikui netinkamos tx (PERMANENT_REJECTS) is pool'o pasalinamos iskart.
+        None – jei account rezime galiojanciu tx nerasta.
+        """
+        if self.mode == "utxo":
+            # UTXO: coinbase kiekvienam mineriui atskirai; pool'o tx (jei yra) tikrinamos viena karta
+            txs = []
+            if tx_pool:
+                tx_batch = self._select_from_pool(tx_pool, BLOCK_TX_LIMIT)
+                txs, rejected = validate_transactions_utxo(tx_batch, self.utxo)
+                if rejected:
+                    print(f"ℹ️  UTXO candidate filtering: {len(txs)} valid, {len(rejected)} rejected.")
+            return BlockTemplate(block_index, prev_hash, txs, self.version, self.difficulty, coinbase_slot=True)
 
-        print(f"\nStarting parallel mining round with {num_miners} miners "
-              f"({len(tx_pool)} pending tx, diff={self.difficulty})")
-        print(f"   Each miner works for {mining_time_limit}s window...")
+        # ACCOUNT model: imu is tx_pool
+        skipped = []   # praleistu langu tx (pvz. truksta lesu) – pool'e lieka
+        valid = []
+        while len(skipped) < TEMPLATE_SCAN_LIMIT:
+            tx_batch = self._select_from_pool(tx_pool, BLOCK_TX_LIMIT, len(skipped))
+            if not tx_batch:
+                break
+            valid, rejected = validate_transactions_account_model(tx_batch, users_by_key)
+            dead = [tx for reason, tx in rejected if reason in PERMANENT_REJECTS]
+            if dead:
+                remove_from_pool(dead)
+            if rejected:
+                print(f"ℹ️  Candidate filtering: {len(valid)} valid, {len(rejected)} rejected "
+                      f"({len(dead)} dropped from pool).")
+            if valid:
+                break
+            skipped.extend(tx for reason, tx in rejected if reason not in PERMANENT_REJECTS)
+            if not isinstance(tx_pool, Mempool):
+                break  # atsitiktine imtis – kitas raundas ims kita
+
+        if not valid:
+            if skipped and len(skipped) >= len(tx_pool):
+                print(f"⚠️  All remaining {len(tx_pool)} tx are invalid. Dropping them and ending mining.")
+                remove_from_pool(skipped)
+            elif skipped:
+                print(f"ℹ️  No valid tx among the top {len(skipped)} pool tx; skipping this round.")
+            return None
+        return BlockTemplate(block_index, prev_hash, valid, self.version, self.difficulty)
 
+    def _mine_with_threads(self, candidates, mining_time_limit):
+        """
+        Kiekvienas mineris dirba skirtingoje gijoje, tikrindamas nonce start, start + step, ...
+        Grazina [(miner, block, nonce, hash)].
+        """
         found_event = threading.Event()
         result_holder = []
 
-        # kiekvienas mineris dirba skirtingose gijose
-        def miner_worker(miner, block):
-            target_prefix = "0" * self.difficulty
+        def miner_worker(miner, block, nonce, step):
+            target = pow_target(self.difficulty)
+            midstate = block.pow_midstate()  # fiksuota antrastes dalis sugeriama viena karta
             start_time = time.time()
             while not found_event.is_set() and (time.time() - start_time < mining_time_limit):
-                h = block.compute_hash()
-                if h.startswith(target_prefix):
+                h = block.hash_int_from_midstate(midstate, nonce)
+                if h < target:
                     found_event.set()
-                    result_holder.append((miner, block, h))
+                    result_holder.append((miner, block, nonce, hash_to_hex(h)))
                     return
-                block.nonce += 1
+                nonce += step
 
         threads = []
-        for miner, block in candidates:
-            t = threading.Thread(target=miner_worker, args=(miner, block))
+        for miner, block, start, step in candidates:
+            t = threading.Thread(target=miner_worker, args=(miner, block, start, step))
             t.start()
             threads.append(t)
 
         for t in threads:
             t.join()
 
-        if not result_holder:
-            print("TIMES UP: No miner found a valid hash within time window.")
-            return None
+        return result_holder
 
-        miner, block, found_hash = result_holder[0]
-        block.hash = found_hash
+    def _mine_with_processes(self, candidates, mining_time_limit, workers=None):
+        """
+        Kiekvienam kandidatui skiriama workers // len(candidates) procesu (bent 1);
+        kandidato nonce seka (start, start + step, ...) padalinama tarp jo procesu.
+        Pirmas radinys sustabdo visus procesus. Grazina [(miner, block, nonce, hash)].
+        """
+        import multiprocessing as mp
 
-        print(f"Miner {miner.name} mined block #{block.index}!")
-        print(f"   hash={found_hash[:16]}…  nonce={block.nonce}")
+        workers = workers or mp.cpu_count()
+        per_candidate = max(1, workers // len(candidates))
+        deadline = time.time() + mining_time_limit
 
-        # 4) Validate and append
-        if not self.add_block(block):
-            print("Block failed chain validation.")
-            return None
+        found_event = mp.Event()
+        results = mp.Queue()
+        procs = []
+        for slot, (_, block, start, step) in enumerate(candidates):
+            for k in range(per_candidate):
+                p = mp.Process(
+                    target=_process_miner_worker,
+                    args=(slot, block, start + k * step, step * per_candidate, deadline, found_event, results),
+                    daemon=True,
+                )
+                p.start()
+                procs.append(p)
 
-        # 5) Apply state changes
-        if self.mode == "utxo":
-            applied, skipped = apply_block_utxo(block, self.utxo)
-            # UTXO mode: is pool'o salinam tik ne-coinbase (coinbase niekada nebuvo poole)
-            mined_non_coinbase = [
-                t for t in block.transactions
-                if not (isinstance(t, UTXOTransaction) and len(t.inputs) == 0)
-            ]
-            remove_from_pool(mined_non_coinbase)
-        else:
-            applied, skipped = update_balances(block.transactions, users_by_key)
-            remove_from_pool(block.transactions)
-
-        # 6) Laimejes mineris gauna coins
-        fees = sum(getattr(tx, "fee", 0) for tx in block.transactions)
-        if self.mode == "account":
-            miner.balance += block_reward + fees  # account mode – kaip buvo
-            print(f"Miner reward: {block_reward} + {fees} fees = {block_reward + fees} coins")
+        result_holder = []
+        try:
+            slot, nonce, h = results.get(timeout=max(0.0, deadline - time.time()) + 1.0)
+            miner, block, _, _ = candidates[slot]
+            result_holder.append((miner, block, nonce, h))
+        except queue.Empty:
+            pass
+        finally:
+            found_event.set()
+            for p in procs:
+                p.join()
+        return result_holder
+
+    def is_valid_chain(
+        self, full: bool = False, parallel: bool = False, workers: Optional[int] = None,
+        use_checkpoint: bool = True,
+    ) -> bool:
+        """Full-chain validation: links and PoW (+ Merkle roots and tx ids if full=True)."""
+        return self.first_invalid_height(
+            full=full, parallel=parallel, workers=workers, use_checkpoint=use_checkpoint
+        ) is None
+
+    def _invalidate_checkpoint(self, block: Block) -> None:
+        """Block listener: pakeitus bloka ties checkpoint'u ar zemiau, checkpoint nuleidziamas zemiau jo."""
+        self._chain_changed(block.index)
+
+    def _chain_changed(self, changed_height: int) -> None:
+        """Grandines listener: pakeitus auksti <= checkpoint'o, checkpoint nuleidziamas zemiau jo."""
+        if self._checkpoint is None or changed_height > self._checkpoint[0]:
+            return
+        height = changed_height - 1
+        if height < 0 or height >= len(self.chain):
+            self._checkpoint = None
         else:
-            # UTXO mode – atlygis jau iskeltas i coinbase TxOut
-            print(f"Miner reward paid via coinbase output: {block_reward} coins")
+            self._checkpoint = (height, self.chain[height].hash, self._checkpoint[2])
 
-        print(f"Block #{block.index} added. Chain length = {len(self.chain)} "
-              f"({applied} tx applied, {skipped} skipped)")
-        return block
+    def _checkpoint_start(self, full: bool) -> int:
+        """Pirmas aukstis, kuri dar reikia tikrinti (0, jei checkpoint'o nera arba jis nebegalioja)."""
+        if self._checkpoint is None:
+            return 0
+        height, h, ckpt_full = self._checkpoint
+        if full and not ckpt_full:
+            return 0
+        if height >= len(self.chain) or self.chain[height].hash != h:
+            self._checkpoint = None
+            return 0
+        if full and mutation_count() != self._checkpoint_mutations:
+            height = self._unchanged_tx_height(height)
+            self._checkpoint_mutations = mutation_count()
+            if height < 0:
+                self._checkpoint = None
+                return 0
+            self._checkpoint = (height, self.chain[height].hash, True)
+        return height + 1
 
-    def is_valid_chain(self) -> bool:
-        """Full-chain validation: links and PoW."""
+    def _unchanged_tx_height(self, height: int) -> int:
+        """Po tx pakeitimu: auksciausias aukstis <= height, iki kurio bloku tx nepakito (-1, jei tokio nera)."""
+        for i in range(height + 1):
+            txs = self.chain[i].transactions
+            if tuple(tx.tx_id_bytes for tx in txs) != self._checkpoint_txs[i] or not all(tx.verify_id() for tx in txs):
+                return i - 1
+        return height
+
+    def first_invalid_height(
+        self, full: bool = False, parallel: bool = False, workers: Optional[int] = None,
+        use_checkpoint: bool = True,
+    ) -> Optional[int]:
+        """
+        Grazina pirmo netinkamo bloko auksti arba None, jei grandine tvarkinga.
+        parallel=True: per-bloko patikrinimai (PoW, Merkle, verify_id) vykdomi procesu baseine,
+        o pigus prev_hash rysiai tikrinami paeiliui pagrindiniame procese.
+        use_checkpoint=True: tikrinama tik nauja grandines dalis virs paskutinio checkpoint'o.
+        """
         if not self.chain:
-            return True
+            return None
         # genesis integrity
         if self.chain[0].index != 0:
-            return False
-        for i in range(1, len(self.chain)):
-            prev = self.chain[i - 1]
+            return 0
+
+        start = self._checkpoint_start(full) if use_checkpoint else 0
+        heights = range(start, len(self.chain))
+        if parallel and len(heights) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            workers = workers or os.cpu_count() or 1
+            chunk = max(1, len(heights) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                block_ok = list(pool.map(
+                    _check_block_standalone, self.chain[start:], heights,
+                    [full] * len(heights), chunksize=chunk,
+                ))
+        else:
+            block_ok = None
+
+        for i in heights:
             curr = self.chain[i]
-            if curr.prev_hash != prev.hash:
-                return False
-            if not curr.is_valid_pow():
-                return False
-        return True
+            if i > 0 and curr.prev_hash != self.chain[i - 1].hash:
+                return i
+            ok = block_ok[i - start] if block_ok is not None else _check_block_standalone(curr, i, full)
+            if not ok:
+                return i
+
+        # viskas patikrinta -> checkpoint ties virsune; pakeitimai blokuose ji nuleis
+        for i in heights:
+            self.chain[i]._on_change = self._invalidate_checkpoint
+        ckpt_full = full and (start == 0 or self._checkpoint[2])
+        self._checkpoint = (len(self.chain) - 1, self.chain[-1].hash, ckpt_full)
+        if ckpt_full:
+            del self._checkpoint_txs[start:]
+            self._checkpoint_txs.extend(tuple(tx.tx_id_bytes for tx in self.chain[i].transactions) for i in heights)
+            self._checkpoint_mutations = mutation_count()
+        return None
 
     def to_dict(self) -> dict:
         return {
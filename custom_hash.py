@@ -1,5 +1,10 @@
 import struct
 
+try:  # numpy neprivalomas – reikalingas tik batch (vektoriniam) kasimui
+    import numpy as np
+except ImportError:
+    np = None
+
 # --- rotate left for 64-bit integers ---
 def rotl64(x: int, r: int) -> int:
     return ((x << r) | (x >> (64 - r))) & 0xFFFFFFFFFFFFFFFF
@@ -40,10 +45,15 @@ def permute_state(state, block_words):
 
 # --- padding function ---
 def pad_message(msg_bytes: bytes) -> bytes:
-    bit_len_low = len(msg_bytes) * 8
+    return pad_tail(msg_bytes, len(msg_bytes))
+
+
+def pad_tail(tail: bytes, total_len: int) -> bytes:
+    """Pad the unabsorbed tail of a message whose full length is total_len bytes."""
+    bit_len_low = total_len * 8
     bit_len_high = 0
 
-    out = bytearray(msg_bytes)
+    out = bytearray(tail)
     out.append(0x80)
     while (len(out) + 16) % 64 != 0:
         out.append(0x00)
@@ -72,33 +82,317 @@ def to_hex256(state):
     return ''.join(f"{x:016x}" for x in state)
 
 
-# --- main custom hash function ---
-def custom_hash256(data: str) -> str:
-    state = [
-        0x6A09E667F3BCC908,
-        0xBB67AE8584CAA73B,
-        0x3C6EF372FE94F82B,
-        0xA54FF53A5F1D36F1,
-    ]
+INITIAL_STATE = (
+    0x6A09E667F3BCC908,
+    0xBB67AE8584CAA73B,
+    0x3C6EF372FE94F82B,
+    0xA54FF53A5F1D36F1,
+)
 
-    msg_bytes = data.encode('utf-8')
-    padded = pad_message(msg_bytes)
 
-    for pos in range(0, len(padded), 64):
-        block = padded[pos:pos + 64]
-        words = block_to_words(block)
+# --- one 64-byte block into the state ---
+def absorb_block(state, block: bytes) -> None:
+    words = block_to_words(block)
 
-        # XOR block into state
-        for i in range(4):
-            state[i] ^= words[i % 8]
+    # XOR block into state
+    for i in range(4):
+        state[i] ^= words[i % 8]
+
+    permute_state(state, words)
 
-        permute_state(state, words)
 
-    # finalization: diffusion rounds
+# --- finalization: diffusion rounds ---
+def finalize_state(state) -> None:
     zero_block = [0] * 8
     for i in range(4):
         state[i] ^= 0x0123456789ABCDEF ^ state[(i + 1) % 4]
     permute_state(state, zero_block)
     permute_state(state, zero_block)
 
+
+# --- binary forms of the digest (same bits as to_hex256) ---
+def to_int256(state) -> int:
+    return (state[0] << 192) | (state[1] << 128) | (state[2] << 64) | state[3]
+
+
+def to_bytes256(state) -> bytes:
+    return struct.pack(">4Q", *state)
+
+
+# --- reference implementation (kept for differential testing of the fast path) ---
+def custom_hash256_reference(data: str) -> str:
+    state = list(INITIAL_STATE)
+
+    msg_bytes = data.encode('utf-8')
+    padded = pad_message(msg_bytes)
+
+    for pos in range(0, len(padded), 64):
+        absorb_block(state, padded[pos:pos + 64])
+
+    finalize_state(state)
     return to_hex256(state)
+
+
+# --- fast path: unrolled rounds generated at import time ---
+# Sugeneruojam tiesini koda be cikly: rotacijos ir konstantos irasytos kaip literalai,
+# zodziai isskaitomi struct'u, nuliniai zodziai finalizacijoje tiesiog praleidziami.
+def _rotl_src(x: str, r: int) -> str:
+    return f"((({x}) << {r}) | (({x}) >> {64 - r})) & M"
+
+
+def _rounds_src(words) -> list[str]:
+    """Source lines for permute_state; words[i] is a variable name or None for a zero word."""
+    def add(x, w):
+        return x if w is None else f"({x} + {w})"
+
+    def xor(x, w):
+        return x if w is None else f"({x} ^ {w})"
+
+    lines = []
+    for r in range(12):
+        rc = f"0x{ROUND_CONSTS[r]:016X}"
+        w = [words[(r + k) % 8] for k in range(4)]
+        lines += [
+            f"a = s0 ^ {rc}; b = s1 ^ {rc}; c = s2 ^ {rc}; d = s3 ^ {rc}",
+            f"t = ({add('a', xor('b', w[0]))}) & M; a = {_rotl_src('t', (7 + r) % 64)}",
+            f"t = (b ^ {add('c', w[1])}) & M; b = {_rotl_src('t', (13 + r) % 64)}",
+            f"t = (c + {xor('d', w[2])}) & M; c = {_rotl_src('t', (17 + r) % 64)}",
+            f"t = (d ^ {add('a', w[3])}) & M; d = {_rotl_src('t', (23 + r) % 64)}",
+            "s1 = b ^ c; s3 = d ^ a",
+            f"s0 = ((a + b) & M) ^ {_rotl_src('s1', 11)}",
+            f"s2 = ((c + d) & M) ^ {_rotl_src('s3', 19)}",
+        ]
+    return lines
+
+
+def _generate_fast_path() -> dict:
+    words = [f"w{i}" for i in range(8)]
+    compress = (
+        ["def compress(s0, s1, s2, s3, w0, w1, w2, w3, w4, w5, w6, w7):",
+         "    s0 ^= w0; s1 ^= w1; s2 ^= w2; s3 ^= w3"]
+        + ["    " + line for line in _rounds_src(words)]
+        + ["    return s0, s1, s2, s3"]
+    )
+    finalize = (
+        ["def finalize(s0, s1, s2, s3):",
+         "    s0 ^= 0x0123456789ABCDEF ^ s1",
+         "    s1 ^= 0x0123456789ABCDEF ^ s2",
+         "    s2 ^= 0x0123456789ABCDEF ^ s3",
+         "    s3 ^= 0x0123456789ABCDEF ^ s0"]
+        + ["    " + line for line in _rounds_src([None] * 8) * 2]
+        + ["    return s0, s1, s2, s3"]
+    )
+    namespace = {"M": 0xFFFFFFFFFFFFFFFF}
+    exec("\n".join(compress) + "\n\n" + "\n".join(finalize), namespace)
+    return namespace
+
+
+_fast = _generate_fast_path()
+_compress = _fast["compress"]
+_finalize = _fast["finalize"]
+_unpack_words = struct.Struct(">8Q").unpack_from
+
+
+def _absorb_fast(state, data: bytes, end: int):
+    """Absorb data[0:end] (end is a multiple of 64) into a 4-tuple state."""
+    for pos in range(0, end, 64):
+        state = _compress(*state, *_unpack_words(data, pos))
+    return state
+
+
+def _hash_state(data: str) -> tuple:
+    padded = pad_message(data.encode('utf-8'))
+    return _finalize(*_absorb_fast(INITIAL_STATE, padded, len(padded)))
+
+
+# --- main custom hash function ---
+def custom_hash256(data: str) -> str:
+    return to_hex256(_hash_state(data))
+
+
+def custom_hash256_digest(data: str) -> bytes:
+    """Raw 32-byte digest; custom_hash256(data) == custom_hash256_digest(data).hex()."""
+    return to_bytes256(_hash_state(data))
+
+
+def custom_hash256_int(data: str) -> int:
+    """Digest as a 256-bit integer, for comparing against a PoW target."""
+    return to_int256(_hash_state(data))
+
+
+class CustomHasher:
+    """
+    Streaming custom_hash256 (update / copy / finalize).
+    Full 64-byte blocks are absorbed as soon as they arrive, so a copy() taken
+    after a fixed prefix (a "midstate") only has to process the remaining tail.
+    CustomHasher(s).finalize() == custom_hash256(s).
+    """
+    __slots__ = ("_state", "_buf", "_length")
+
+    def __init__(self, data: str | bytes = b""):
+        self._state = INITIAL_STATE
+        self._buf = b""
+        self._length = 0
+        if data:
+            self.update(data)
+
+    def update(self, data: str | bytes) -> None:
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._length += len(data)
+        buf = self._buf + data
+        full = len(buf) - len(buf) % 64
+        self._state = _absorb_fast(self._state, buf, full)
+        self._buf = buf[full:]
+
+    def copy(self) -> "CustomHasher":
+        clone = CustomHasher.__new__(CustomHasher)
+        clone._state = self._state  # tuple – dalintis saugu
+        clone._buf = self._buf
+        clone._length = self._length
+        return clone
+
+    def _final_state(self) -> tuple:
+        padded = pad_tail(self._buf, self._length)
+        return _finalize(*_absorb_fast(self._state, padded, len(padded)))
+
+    def finalize(self) -> str:
+        """Hex digest; the hasher itself is left untouched and can be reused."""
+        return to_hex256(self._final_state())
+
+    def digest(self) -> bytes:
+        return to_bytes256(self._final_state())
+
+    def intdigest(self) -> int:
+        return to_int256(self._final_state())
+
+
+# --- NumPy batch evaluation (many nonces per call) ---
+def _require_numpy():
+    if np is None:
+        raise ImportError("custom_hash256 batch API requires numpy (pip install numpy)")
+
+
+def _rotl64_vec(x, r: int):
+    return (x << np.uint64(r)) | (x >> np.uint64(64 - r))
+
+
+def _permute_state_vec(state, block_words):
+    """permute_state over uint64 arrays; the arithmetic wraps mod 2**64 like the & masks."""
+    for r in range(12):
+        rc = np.uint64(ROUND_CONSTS[r])
+        a, b, c, d = (x ^ rc for x in state)
+
+        a = _rotl64_vec(a + (block_words[(r + 0) % 8] ^ b), (7 + r) % 64)
+        b = _rotl64_vec(b ^ (c + block_words[(r + 1) % 8]), (13 + r) % 64)
+        c = _rotl64_vec(c + (d ^ block_words[(r + 2) % 8]), (17 + r) % 64)
+        d = _rotl64_vec(d ^ (a + block_words[(r + 3) % 8]), (23 + r) % 64)
+
+        s0 = a + b
+        s1 = b ^ c
+        s2 = c + d
+        s3 = d ^ a
+        state[0] = s0 ^ _rotl64_vec(s1, 11)
+        state[1] = s1
+        state[2] = s2 ^ _rotl64_vec(s3, 19)
+        state[3] = s3
+
+
+def _nonce_digit_groups(nonces):
+    """Split nonces into groups with the same decimal length: yields (length, index_array)."""
+    lengths = np.ones(len(nonces), dtype=np.int64)
+    # uint64 <= 2**64 - 1 (20 skaitmenu): tikrinam 10**1 .. 10**19, 10**20 jau netelpa
+    for exp in range(1, 20):
+        more = nonces >= np.uint64(10 ** exp)
+        if not more.any():
+            break
+        lengths += more
+    for length in np.unique(lengths):
+        yield int(length), np.flatnonzero(lengths == length)
+
+
+def custom_hash256_batch_state(prefix, nonces, suffix: str = ""):
+    """
+    Hash prefix + str(nonce) + suffix for every nonce at once.
+    prefix may be a str or a CustomHasher midstate (e.g. Block.pow_midstate()).
+    Returns the final 4 state words as uint64 arrays (a, b, c, d), one lane per nonce;
+    to_hex256 of lane i equals custom_hash256(prefix + str(nonces[i]) + suffix).
+    """
+    _require_numpy()
+    midstate = prefix if isinstance(prefix, CustomHasher) else CustomHasher(prefix)
+    nonces = np.asarray(nonces, dtype=np.uint64)
+    suffix_bytes = suffix.encode('utf-8')
+    out = [np.empty(len(nonces), dtype=np.uint64) for _ in range(4)]
+
+    for length, idx in _nonce_digit_groups(nonces):
+        group = nonces[idx]
+        buf = midstate._buf
+        total_len = midstate._length + length + len(suffix_bytes)
+        # pad_tail tik del ilgio; skaitmenys irasomi zemiau
+        template = pad_tail(buf + b"0" * length + suffix_bytes, total_len)
+
+        rows = np.tile(np.frombuffer(template, dtype=np.uint8), (len(group), 1))
+        rest = group.copy()
+        for pos in range(len(buf) + length - 1, len(buf) - 1, -1):
+            rows[:, pos] = (rest % np.uint64(10)).astype(np.uint8) + ord("0")
+            rest //= np.uint64(10)
+
+        words = rows.view(">u8").astype(np.uint64)  # big-endian zodziai, kaip block_to_words
+        state = [np.full(len(group), x, dtype=np.uint64) for x in midstate._state]
+        for blk in range(words.shape[1] // 8):
+            block_words = [words[:, blk * 8 + j] for j in range(8)]
+            for i in range(4):
+                state[i] = state[i] ^ block_words[i]
+            _permute_state_vec(state, block_words)
+
+        # finalization (same as finalize_state)
+        mix = np.uint64(0x0123456789ABCDEF)
+        for i in range(4):
+            state[i] = state[i] ^ mix ^ state[(i + 1) % 4]
+        zero_block = [np.uint64(0)] * 8
+        _permute_state_vec(state, zero_block)
+        _permute_state_vec(state, zero_block)
+
+        for i in range(4):
+            out[i][idx] = state[i]
+    return tuple(out)
+
+
+def custom_hash256_batch(prefix, nonces, suffix: str = "") -> list[str]:
+    """Hex digests of prefix + str(nonce) + suffix, identical to custom_hash256 per nonce."""
+    a, b, c, d = custom_hash256_batch_state(prefix, nonces, suffix)
+    return [to_hex256(words) for words in zip(a.tolist(), b.tolist(), c.tolist(), d.tolist())]
+
+
+def below_target_mask(state_words, target: int):
+    """Vectorized to_int256(lane) < target over the output of custom_hash256_batch_state."""
+    _require_numpy()
+    n = len(state_words[0])
+    if target >= 1 << 256:  # difficulty 0 -> tinka viskas
+        return np.ones(n, dtype=bool)
+    below = np.zeros(n, dtype=bool)
+    equal = np.ones(n, dtype=bool)
+    for i, word in enumerate(state_words):
+        t = np.uint64((target >> (192 - 64 * i)) & 0xFFFFFFFFFFFFFFFF)
+        below |= equal & (word < t)
+        equal &= word == t
+    return below
+
+
+if __name__ == "__main__":  # diferencinis testas: greitas kelias == referencinis
+    import random
+
+    rng = random.Random(1234)
+    alphabet = "abcxyz0123456789|:ąčęėįšųūž "
+    samples = ["", "a", "a" * 47, "a" * 48, "a" * 63, "a" * 64, "a" * 65, "a" * 1000]
+    samples += ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 300))) for _ in range(500)]
+    for s in samples:
+        expected = custom_hash256_reference(s)
+        assert custom_hash256(s) == expected, s
+        assert custom_hash256_digest(s).hex() == expected, s
+        assert f"{custom_hash256_int(s):064x}" == expected, s
+        split = rng.randint(0, len(s))
+        h = CustomHasher(s[:split]).copy()
+        h.update(s[split:])
+        assert h.finalize() == expected, s
+    print(f"OK: fast path matches reference on {len(samples)} inputs")
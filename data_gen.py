@@ -1,7 +1,12 @@
-from user import generate_users
+from user import User, generate_users
 from transaction import Transaction
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+import os
 import random
 import json
+import struct
 
 def generate_transactions(users, n=10000):
     txs = []
@@ -18,28 +23,186 @@ def generate_transactions(users, n=10000):
     return txs
 
 
+# === Dideli atkuriami dataset'ai (load testams) ===
+#
+# Transakcijos generuojamos chunk'ais per kelis procesus; kiekvienas chunk'as turi savo
+# seed'a (f"{seed}:{chunk}"), todel rezultatas nepriklauso nuo workeriu skaiciaus.
+# Failas rasomas srautu (NDJSON arba binarinis), tad atmintyje niekada nebuna viso dataset'o.
+#
+# Binarinis formatas:
+#   [antraste DATASET_HEADER][users: pub 32B + balance 8B]...[tx: TX_RECORD]...
+# tx irase siuntejas/gavejas saugomi kaip vartotoju indeksai.
+
+DATASET_EPOCH = 1_700_000_000  # tx timestamp = DATASET_EPOCH + tx numeris (atkuriama ir unikalu)
+DATASET_MAGIC = b"TXD1"
+DATASET_HEADER = struct.Struct(">4sQIQI")   # magic, seed, users, transactions, chunk_size
+USER_RECORD = struct.Struct(">32sQ")
+TX_RECORD = struct.Struct(">IIQQ32s")       # sender idx, receiver idx, amount, timestamp, tx_id
+
+_worker_users: Tuple[List[str], List[int]] = ([], [])
+
+
+def dataset_users(n_users: int, seed: int) -> List[User]:
+    """Vartotojai deterministiskai is seed'o."""
+    return generate_users(n_users, random.Random(f"{seed}:users"))
+
+
+def _init_worker(keys: List[str], balances: List[int]) -> None:
+    global _worker_users
+    _worker_users = (keys, balances)
+
+
+def _generate_chunk(seed: int, chunk: int, start: int, count: int, binary: bool) -> bytes:
+    """Sugeneruoja ir suhashina vieno chunk'o transakcijas; grazina jau uzkoduotus irasus."""
+    keys, balances = _worker_users
+    rng = random.Random(f"{seed}:{chunk}")
+    n = len(keys)
+    out = []
+    for i in range(count):
+        s = rng.randrange(n)
+        r = rng.randrange(n - 1)
+        if r >= s:  # kad negaletu sau siust
+            r += 1
+        amount = rng.randint(1, balances[s])
+        tx = Transaction(keys[s], keys[r], amount, DATASET_EPOCH + start + i)
+        if binary:
+            out.append(TX_RECORD.pack(s, r, amount, tx.timestamp, tx.tx_id_bytes))
+        else:
+            out.append(json.dumps({"kind": "tx", "sender": tx.sender, "receiver": tx.receiver,
+                                   "amount": amount, "timestamp": tx.timestamp, "tx_id": tx.tx_id},
+                                  separators=(",", ":")) + "\n")
+    return b"".join(out) if binary else "".join(out).encode("utf-8")
+
+
+def write_dataset(path: str, n_users: int, n_txs: int, seed: int = 0, binary: bool = False,
+                  workers: Optional[int] = None, chunk_size: int = 50_000) -> List[User]:
+    """
+    Sugeneruoja n_users vartotoju ir n_txs transakciju i faila (NDJSON arba binarini).
+    Tas pats (seed, n_users, n_txs, chunk_size) visada duoda ta pati faila.
+    """
+    if n_users < 2:
+        raise ValueError("dataset needs at least 2 users")
+    users = dataset_users(n_users, seed)
+    keys = [u.public_key for u in users]
+    balances = [u.balance for u in users]
+    chunks = [(seed, c, start, min(chunk_size, n_txs - start), binary)
+              for c, start in enumerate(range(0, n_txs, chunk_size))]
+    workers = workers or os.cpu_count() or 1
+
+    with open(path, "wb") as f:
+        if binary:
+            f.write(DATASET_HEADER.pack(DATASET_MAGIC, seed, n_users, n_txs, chunk_size))
+            f.write(b"".join(USER_RECORD.pack(bytes.fromhex(u.public_key), u.balance) for u in users))
+        else:
+            meta = {"kind": "meta", "seed": seed, "users": n_users, "transactions": n_txs, "chunk_size": chunk_size}
+            lines = [json.dumps(meta)] + [
+                json.dumps({"kind": "user", "name": u.name, "pub": u.public_key, "balance": u.balance})
+                for u in users
+            ]
+            f.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+        if workers == 1 or len(chunks) <= 1:
+            _init_worker(keys, balances)
+            for args in chunks:
+                f.write(_generate_chunk(*args))
+            return users
+
+        # chunk'ai rasomi eiles tvarka; vienu metu "skrenda" ne daugiau kaip 2*workers (ribota atmintis)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(keys, balances)) as pool:
+            pending = deque()
+            for args in chunks:
+                pending.append(pool.submit(_generate_chunk, *args))
+                if len(pending) >= 2 * workers:
+                    f.write(pending.popleft().result())
+            while pending:
+                f.write(pending.popleft().result())
+    return users
+
+
+def _is_binary(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(DATASET_MAGIC)) == DATASET_MAGIC
+
+
+def read_users(path: str) -> List[User]:
+    """Dataset'o vartotojai (skaitoma tik failo pradzia)."""
+    if _is_binary(path):
+        with open(path, "rb") as f:
+            _, _, n_users, _, _ = DATASET_HEADER.unpack(f.read(DATASET_HEADER.size))
+            raw = f.read(n_users * USER_RECORD.size)
+        return [User(f"User{i+1}", pub.hex(), bal)
+                for i, (pub, bal) in enumerate(USER_RECORD.iter_unpack(raw))]
+
+    users = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            d = json.loads(line)
+            if d["kind"] == "user":
+                users.append(User(d["name"], d["pub"], d["balance"]))
+            elif d["kind"] == "tx":
+                break
+    return users
+
+
+def iter_transactions(path: str, batch_size: int = 10_000) -> Iterator[Transaction]:
+    """
+    Srautinis transakciju skaitymas (failas skaitomas gabalais, ne visas).
+    tx_id paimamas is failo be perhashinimo – tikrinti galima per tx.verify_id().
+    """
+    if _is_binary(path):
+        with open(path, "rb") as f:
+            _, _, n_users, _, _ = DATASET_HEADER.unpack(f.read(DATASET_HEADER.size))
+            keys = [pub.hex() for pub, _ in USER_RECORD.iter_unpack(f.read(n_users * USER_RECORD.size))]
+            while True:
+                raw = f.read(batch_size * TX_RECORD.size)
+                if not raw:
+                    break
+                for s, r, amount, ts, tx_id in TX_RECORD.iter_unpack(raw):
+                    yield Transaction.from_fields(keys[s], keys[r], amount, ts, tx_id)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            d = json.loads(line)
+            if d["kind"] == "tx":
+                yield Transaction.from_fields(d["sender"], d["receiver"], d["amount"], d["timestamp"],
+                                              bytes.fromhex(d["tx_id"]))
+
+
+def feed_mempool(path: str, mempool, limit: Optional[int] = None) -> int:
+    """Pripildo mempool is dataset'o failo (iki limit tx); grazina kiek prideta."""
+    added = 0
+    for tx in iter_transactions(path):
+        if limit is not None and added >= limit:
+            break
+        if mempool.add(tx):
+            added += 1
+    return added
+
+
 if __name__ == "__main__":
-    users = generate_users(1000)
-    transactions = generate_transactions(users, 10_000)
+    import sys
+    import time
+
+    # python data_gen.py [n_txs] [bin]
+    n_txs = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    binary = "bin" in sys.argv[2:]
+    path = "blockchain_data.bin" if binary else "blockchain_data.ndjson"
+
+    t0 = time.perf_counter()
+    users = write_dataset(path, 1000, n_txs, seed=42, binary=binary)
+    elapsed = time.perf_counter() - t0
+    print(f"Generated {len(users)} users and {n_txs} transactions -> {path} "
+          f"({os.path.getsize(path) / 2**20:.1f} MiB, {elapsed:.2f}s)\n")
 
-    print(f"Generated {len(users)} users and {len(transactions)} transactions.\n")
     print("PVZ users:")
-    for u in users[:5]:
+    for u in read_users(path)[:5]:
         print(" ", u)
 
     print("\nPVZ transactions:")
-    for t in transactions[:5]:
+    for i, t in enumerate(iter_transactions(path)):
+        if i == 5:
+            break
+        assert t.verify_id()
         print(" ", t)
-
-    # Export data as jjson 
-    data = {
-        "users": [{"name": u.name, "pub": u.public_key, "balance": u.balance} for u in users],
-        "transactions": [
-            {"sender": t.sender, "receiver": t.receiver, "amount": t.amount, "tx_id": t.tx_id}
-            for t in transactions
-        ]
-    }
-
-    with open("blockchain_data.json", "w") as f:
-        json.dump(data, f, indent=2)
-
@@ -0,0 +1,204 @@
+"""
+ledger.py – masyvu pagrindo paskyru balansai (account modelis)
+---------------------------------------------------------------
+Viesieji raktai internuojami i sveikuosius id, balansai laikomi NumPy int64 masyve.
+Bloko transakcijos pritaikomos paketu – rezultatas lygiai toks pat kaip update_balances():
+
+  * "nepriklausoma" tx: siuntejas bloke siuncia tik karta ir iki tol nieko negauna –
+    jos balansas tikrinamas vektoriskai pagal pradini balansa;
+  * likusios (priklausomos) tx tikrinamos nuosekliai, bet tik per tas tx, kurios liecia
+    priklausomu siunteju saskaitas (ju debetai ir kreditai sekami dict'e);
+  * pritaikytu tx debetai/kreditai suvedami per np.subtract.at / np.add.at.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:  # numpy neprivalomas – be jo lieka update_balances()
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from user import User
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("AccountLedger requires numpy (pip install numpy)")
+
+
+class AccountLedger:
+    def __init__(self, users: Iterable[User] = ()):
+        _require_numpy()
+        self._ids: Dict[str, int] = {}   # public_key -> id
+        self.keys: List[str] = []        # id -> public_key
+        self.names: List[str] = []       # id -> vardas
+        self._balances = np.zeros(16, dtype=np.int64)
+        for u in users:
+            self.add_account(u.public_key, u.balance, u.name)
+
+    # --- paskyros ---
+    def add_account(self, key: str, balance: int = 0, name: Optional[str] = None) -> int:
+        """Internuoja rakta; grazina jo id (esamai paskyrai – esama id, balansas nekeiciamas)."""
+        acc = self._ids.get(key)
+        if acc is not None:
+            return acc
+        acc = len(self.keys)
+        if acc == len(self._balances):
+            self._balances = np.concatenate([self._balances, np.zeros(acc, dtype=np.int64)])
+        self._ids[key] = acc
+        self.keys.append(key)
+        self.names.append(name or key[:8])
+        self._balances[acc] = balance
+        return acc
+
+    def id_of(self, key: str) -> Optional[int]:
+        return self._ids.get(key)
+
+    @property
+    def balances(self):
+        """Balansu masyvas pagal id (vaizdas, ne kopija)."""
+        return self._balances[:len(self.keys)]
+
+    def balance(self, key: str) -> int:
+        return int(self._balances[self._ids[key]])
+
+    def credit(self, key: str, amount: int) -> None:
+        """Tiesioginis kreditas (pvz. bloko atlygis kasejui)."""
+        self._balances[self._ids[key]] += amount
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._ids
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # --- paketinis pritaikymas ---
+    def apply_block(self, transactions: List, applied_out: Optional[list] = None) -> Tuple[int, int]:
+        """
+        Pritaiko transakcijas kaip update_balances(): tx praleidziama, jei dalyvis nezinomas,
+        suma <= 0 arba siuntejui tuo momentu truksta lesu. Grazina (applied, skipped).
+        """
+        n = len(transactions)
+        ids = self._ids
+        s = np.fromiter((ids.get(tx.sender, -1) for tx in transactions), dtype=np.int64, count=n)
+        r = np.fromiter((ids.get(tx.receiver, -1) for tx in transactions), dtype=np.int64, count=n)
+        amt = np.fromiter((tx.amount for tx in transactions), dtype=np.int64, count=n)
+
+        ok = self.apply_transfers(s, r, amt)
+        applied = int(ok.sum())
+        if applied_out is not None:
+            applied_out.extend(transactions[i] for i in np.flatnonzero(ok).tolist())
+        return applied, n - applied
+
+    def apply_transfers(self, s, r, amt):
+        """
+        Masyvu lygio pritaikymas (id jau internuoti, -1 = nezinomas dalyvis).
+        Grazina bool masyva: kurie pervedimai pritaikyti.
+        """
+        s = np.asarray(s, dtype=np.int64)
+        r = np.asarray(r, dtype=np.int64)
+        amt = np.asarray(amt, dtype=np.int64)
+        idx = np.flatnonzero((s >= 0) & (r >= 0) & (amt > 0))
+        ss, rr, aa = s[idx], r[idx], amt[idx]
+        m = len(idx)
+        pos = np.arange(m)
+
+        # nepriklausoma: vienintelis siuntimas ir jokio ankstesnio gavimo (savo paties tx irgi skaitosi)
+        n_acc = len(self.keys)
+        send_count = np.bincount(ss, minlength=n_acc)
+        first_recv = np.full(n_acc, m, dtype=np.int64)
+        np.minimum.at(first_recv, rr, pos)
+        indep = (send_count[ss] == 1) & (first_recv[ss] > pos)
+
+        ok = np.zeros(m, dtype=bool)
+        ok[indep] = self._balances[ss[indep]] >= aa[indep]
+
+        if not indep.all():
+            dep_accounts = np.unique(ss[~indep])
+            touching = np.flatnonzero(np.isin(ss, dep_accounts) | np.isin(rr, dep_accounts))
+            bal = dict(zip(dep_accounts.tolist(), self._balances[dep_accounts].tolist()))
+            ss_l, rr_l, aa_l, indep_l = ss.tolist(), rr.tolist(), aa.tolist(), indep.tolist()
+            for p in touching.tolist():
+                a_s, a_r, a = ss_l[p], rr_l[p], aa_l[p]
+                if indep_l[p]:
+                    applied = ok[p]           # jau nuspresta vektoriskai
+                else:
+                    applied = bal[a_s] >= a
+                    ok[p] = applied
+                if applied:
+                    if a_s in bal:
+                        bal[a_s] -= a
+                    if a_r in bal:
+                        bal[a_r] += a
+
+        np.subtract.at(self._balances, ss[ok], aa[ok])
+        np.add.at(self._balances, rr[ok], aa[ok])
+
+        result = np.zeros(len(s), dtype=bool)
+        result[idx[ok]] = True
+        return result
+
+    def apply_blocks(self, blocks: Iterable, block_rewards: Optional[Dict[str, Tuple[User, int]]] = None) -> Tuple[int, int]:
+        """Istorines grandines perzaidimas; block_rewards – kaip Blockchain.block_rewards."""
+        applied = skipped = 0
+        for block in blocks:
+            a, sk = self.apply_block(block.transactions)
+            applied += a
+            skipped += sk
+            reward = (block_rewards or {}).get(block.hash)
+            if reward is not None:
+                miner, amount = reward
+                self.credit(miner.public_key, amount)
+        return applied, skipped
+
+    def write_back(self, users_by_key: Dict[str, User]) -> None:
+        """Iraso balansus atgal i User objektus."""
+        for key, bal in zip(self.keys, self.balances.tolist()):
+            user = users_by_key.get(key)
+            if user is not None:
+                user.balance = bal
+
+
+if __name__ == "__main__":  # tikslumo ir greicio palyginimas su update_balances
+    import contextlib
+    import io
+    import random
+    import time
+    from transaction import Transaction
+    from user import update_balances
+
+    rng = random.Random(1)
+    # dideles grandines profilis: daug saskaitu, dalis siunteju kartojasi, dalis neturi lesu,
+    # keli nezinomi dalyviai ir 0 sumos
+    users = [User(f"User{i+1}", f"{i:064x}", rng.randint(100, 1_000_000)) for i in range(200_000)]
+    keys = [u.public_key for u in users]
+    active = keys[:20_000]
+    txs = []
+    for i in range(100_000):
+        sender = rng.choice(keys if i % 3 else active) if i % 500 else "unknown"
+        amount = rng.randint(0, 600_000)
+        txs.append(Transaction(sender, rng.choice(keys), amount, 1_700_000_000 + i))
+
+    ledger = AccountLedger(users)
+    t0 = time.perf_counter()
+    applied_l, skipped_l = ledger.apply_block(txs)
+    t_ledger = time.perf_counter() - t0
+
+    users_by_key = {u.public_key: u for u in users}
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        applied_u, skipped_u = update_balances(txs, users_by_key)
+    t_ref = time.perf_counter() - t0
+
+    assert (applied_l, skipped_l) == (applied_u, skipped_u)
+    assert ledger.balances.tolist() == [u.balance for u in users]
+    print(f"✅ AccountLedger == update_balances ({applied_l} applied, {skipped_l} skipped)")
+    print(f"update_balances: {t_ref * 1000:7.1f} ms   AccountLedger: {t_ledger * 1000:7.1f} ms")
+
+    # jau internuoti id (pvz. binarinis data_gen dataset'as): be tx objektu perejimo
+    s = np.array([ledger.id_of(tx.sender) if tx.sender in ledger else -1 for tx in txs])
+    r = np.array([ledger.id_of(tx.receiver) for tx in txs])
+    a = np.array([tx.amount for tx in txs])
+    t0 = time.perf_counter()
+    ledger.apply_transfers(s, r, a)
+    print(f"apply_transfers (id masyvai): {(time.perf_counter() - t0) * 1000:7.1f} ms")
@@ -4,6 +4,8 @@ import time
 import sys
 from data_gen import generate_users, generate_transactions
 from blockchain import Blockchain
+from block_store import BlockStore
+from mempool import Mempool
 from transaction import Transaction
 
 # === PARAMETRAI ===
@@ -12,9 +14,13 @@ DIFFICULTY = 3             # "000" prefix reikalavimas
 BLOCK_REWARD = 50          # monetu kiekis duotas mineriui
 MINING_TIME_LIMIT = 5      # laiko limitas sekundemis
 MODE = "account"           # utxo (bitcoin-tipo) ar account modelis
+MINING_ENGINE = "thread"   # "thread" arba "process" (procesai naudoja visus branduolius)
+STORE_PATH = "blockchain_v0_2.blk"  # append-only bloku saugykla
 
 if len(sys.argv) > 1 and sys.argv[1].lower() == "utxo":
     MODE = "utxo"
+if "process" in (a.lower() for a in sys.argv[1:]):
+    MINING_ENGINE = "process"
 
 def chunked(lst: List, n: int):
     """Yield successive n-sized chunks from list."""
@@ -27,7 +33,7 @@ def main():
     print("🚀 Generating data…")
     users = generate_users(10)
     users_by_key = {u.public_key: u for u in users}
-    tx_pool: List[Transaction] = generate_transactions(users, 50)
+    tx_pool = Mempool(generate_transactions(users, 50))
     print(f"✅ Users: {len(users)}  |  Transactions: {len(tx_pool)}")
 
     # pasirenka 5 miners atsitiktinai
@@ -38,12 +44,12 @@ def main():
 
     # kaip isimame is pool'o iskastas transakcijas (callback i blockchain.mine_next_block)
     def remove_from_pool(mined: List[Transaction]):
-        mined_ids = {t.tx_id for t in mined}
-        tx_pool[:] = [t for t in tx_pool if t.tx_id not in mined_ids]
+        tx_pool.remove(mined)
         print(f"🧹 Removed {len(mined)} tx from pool. Remaining: {len(tx_pool)}")
 
-    # Blockchain inicializacija
-    bc = Blockchain(difficulty=DIFFICULTY, version="v0.2", mode=MODE)  # cia galima pakeist tarp account ir utxo modes
+    # Blockchain inicializacija; kiekvienas priimtas blokas iskart prirasomas i STORE_PATH
+    store = BlockStore.create(STORE_PATH)
+    bc = Blockchain(difficulty=DIFFICULTY, version="v0.2", mode=MODE, store=store)  # cia galima pakeist tarp account ir utxo modes
     bc.create_genesis_block()
     if MODE == "utxo":
         bc.seed_utxo_from_balances(users_by_key)
@@ -63,6 +69,7 @@ def main():
                 miners=miners,
                 block_reward=BLOCK_REWARD,
                 mining_time_limit=time_limit,
+                engine=MINING_ENGINE,
             )
             # jei nerado per langa – padidinam
             if mined_block is None:
@@ -72,8 +79,32 @@ def main():
             # jei pavyko – grazinam i pradine reiksme
             time_limit = MINING_TIME_LIMIT
 
+    elif MINING_ENGINE == "thread":
+        # ACCOUNT: neblokuojantis MiningJob – laiko limito dvigubinti nebereikia, o mazgas kol kas
+        # kasama galetu priimti naujas tx (tx_pool.add + job.refresh()) ar kitu mazgu blokus
+        while tx_pool:
+            print("\n⛏️  Starting mining job…")
+            job = bc.start_mining(
+                tx_pool=tx_pool,
+                users_by_key=users_by_key,
+                remove_from_pool=remove_from_pool,
+                miners=miners,
+                block_reward=BLOCK_REWARD,
+            )
+            while not job.done():
+                time.sleep(0.05)  # cia – kitas mazgo darbas
+            status, mined_block = job.poll()
+            if job.error is not None:
+                raise job.error
+            if status != job.FOUND:
+                print(f"⏹️  Mining job ended: {status}")
+                if status == job.NO_CANDIDATES:
+                    break
+        if not tx_pool:
+            print("✅ Transaction pool is empty. Mining completed.")
+
     else:
-        # ACCOUNT: sena while tx_pool logika
+        # ACCOUNT (process engine): raundai su laiko limitu
         while tx_pool:
             print(f"\n⛏️  Starting mining round (time limit = {time_limit}s)…")
             mined_block = bc.mine_next_block(
@@ -83,6 +114,7 @@ def main():
                 miners=miners,
                 block_reward=BLOCK_REWARD,
                 mining_time_limit=time_limit,
+                engine=MINING_ENGINE,
             )
             if not tx_pool:
                 print("✅ Transaction pool is empty. Mining completed.")
@@ -102,6 +134,8 @@ def main():
     print("\n🔎 Final chain check:", "valid ✅" if bc.is_valid_chain() else "invalid ❌")
     assert bc.is_valid_chain(), "Chain invalid after mining"
     print(f"⛓️  Total blocks (incl. genesis): {len(bc.chain)}")
+    if bc.state_root is not None:
+        print(f"🌳 State root: {bc.state_root[:16]}…")
     print("🧾 Last 3 blocks:")
     for b in bc.chain[-3:]:
         print(f"  • #{b.index} | hash={b.hash[:16]}… | tx={len(b.transactions)} | nonce={b.nonce}")
@@ -110,11 +144,9 @@ def main():
     for m in miners:
         print(f"  {m.name}: {m.balance} coins")
 
-    # tamper testui, kitiems panaudojimams blockchaino kaip json failo
-    import json
-    with open("blockchain_v0_2.json", "w") as f:
-        json.dump(bc.to_dict(), f, indent=2)
-    print("Issaugota blockchain_v0_2.json")
+    # blokai jau irasyti add_block metu (tamper testui ir kitiems panaudojimams)
+    store.close()
+    print(f"Issaugota {STORE_PATH} ({len(bc.chain)} blocks)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,147 @@
+"""
+mempool.py – indeksuotas laukianciu transakciju baseinas
+---------------------------------------------------------
+Transakcijos laikomos pagal tx_id_bytes (O(1) paieska ir salinimas; visos strukturos dalijasi
+tuo paciu tx objekto bytes raktu – hex eilute kuriama tik sasajoje), kiekvienam siuntejui
+vedama jo transakciju eile (pagal atvykimo tvarka), o prioritetinis pasirinkimas
+(didziausias fee, po to seniausia) daromas per heap su "tingiu" pasenusiu irasu salinimu.
+
+Baseinas turi savo spyna: MiningJob fonineje gijoje renkasi/salina tx, o mazgo gija tuo metu
+gali kviesti add() (heap perstatymas _compact_heap neprarandamas del lygiagretaus heappush).
+"""
+
+import functools
+import heapq
+import random
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+def _key(tx) -> bytes:
+    """Raktas is tx objekto, hex tx_id arba jau bytes."""
+    if isinstance(tx, bytes):
+        return tx
+    if isinstance(tx, str):
+        return bytes.fromhex(tx)
+    return tx.tx_id_bytes
+
+
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class Mempool:
+    def __init__(self, txs: Iterable = ()):
+        self._txs: Dict[bytes, object] = {}                  # tx_id_bytes -> tx
+        self._ids: List[bytes] = []                          # tankus sarasas atsitiktiniam sample
+        self._pos: Dict[bytes, int] = {}                     # tx_id_bytes -> indeksas _ids sarase
+        self._by_sender: Dict[str, Dict[bytes, None]] = {}   # sender -> tx_id eile (dict islaiko tvarka)
+        self._heap: list = []                                # (-fee, timestamp, seq, tx_id_bytes)
+        self._live_seq: Dict[bytes, int] = {}                # tx_id_bytes -> seq galiojancio heap iraso
+        self._seq = 0
+        self._lock = threading.RLock()
+        for tx in txs:
+            self.add(tx)
+
+    # --- pridejimas / salinimas ---
+    @_locked
+    def add(self, tx) -> bool:
+        """Prideda tx; grazina False, jei toks tx_id jau yra."""
+        key = tx.tx_id_bytes
+        if key in self._txs:
+            return False
+        self._txs[key] = tx
+        self._pos[key] = len(self._ids)
+        self._ids.append(key)
+        sender = getattr(tx, "sender", None)
+        if sender is not None:
+            self._by_sender.setdefault(sender, {})[key] = None
+        heapq.heappush(self._heap, (-getattr(tx, "fee", 0), tx.timestamp, self._seq, key))
+        self._live_seq[key] = self._seq
+        self._seq += 1
+        return True
+
+    @_locked
+    def discard(self, tx_id) -> Optional[object]:
+        """Pasalina tx pagal id (hex arba bytes) per O(1); grazina pasalinta tx arba None."""
+        tx_id = _key(tx_id)
+        tx = self._txs.pop(tx_id, None)
+        if tx is None:
+            return None
+        del self._live_seq[tx_id]
+        # swap-remove is tankaus saraso
+        i = self._pos.pop(tx_id)
+        last = self._ids.pop()
+        if last != tx_id:
+            self._ids[i] = last
+            self._pos[last] = i
+        sender = getattr(tx, "sender", None)
+        if sender is not None:
+            queue = self._by_sender[sender]
+            del queue[tx_id]
+            if not queue:
+                del self._by_sender[sender]
+        # heap irasas lieka iki kito select() (tingus salinimas)
+        if len(self._heap) > 2 * len(self._txs) + 64:
+            self._compact_heap()
+        return tx
+
+    @_locked
+    def remove(self, txs: Iterable) -> int:
+        """Pasalina iskastas transakcijas (tx objektai, hex arba bytes tx_id); grazina kiek pasalinta."""
+        removed = 0
+        for t in txs:
+            if self.discard(_key(t)) is not None:
+                removed += 1
+        return removed
+
+    def _compact_heap(self) -> None:
+        self._heap = [e for e in self._heap if self._live_seq.get(e[3]) == e[2]]
+        heapq.heapify(self._heap)
+
+    # --- pasirinkimas ---
+    @_locked
+    def select(self, n: int, skip: int = 0) -> list:
+        """
+        Iki n transakciju pagal prioriteta: didziausias fee, tada seniausias timestamp.
+        skip – praleidziama tiek auksciausio prioriteto tx (pvz. jau atmestas ruosinio langas).
+        """
+        chosen, entries = [], []
+        while self._heap and len(chosen) < n:
+            entry = heapq.heappop(self._heap)
+            if self._live_seq.get(entry[3]) != entry[2]:
+                continue  # pasenes irasas (tx jau pasalintas)
+            entries.append(entry)
+            if len(entries) > skip:
+                chosen.append(self._txs[entry[3]])
+        for entry in entries:  # pasirinkimas nesalina is baseino
+            heapq.heappush(self._heap, entry)
+        return chosen
+
+    @_locked
+    def sample(self, n: int) -> list:
+        """Atsitiktines n transakciju (kaip random.sample(tx_pool, n)), O(n)."""
+        return [self._txs[i] for i in random.sample(self._ids, min(n, len(self._ids)))]
+
+    @_locked
+    def from_sender(self, sender: str) -> list:
+        """Siuntejo transakcijos atvykimo tvarka."""
+        return [self._txs[i] for i in self._by_sender.get(sender, ())]
+
+    # --- konteinerio sasaja ---
+    def get(self, tx_id):
+        return self._txs.get(_key(tx_id))
+
+    def __contains__(self, tx) -> bool:
+        return _key(tx) in self._txs
+
+    def __len__(self) -> int:
+        return len(self._txs)
+
+    @_locked
+    def __iter__(self) -> Iterator:
+        return iter(list(self._txs.values()))  # kopija – kita gija gali keisti baseina iteruojant
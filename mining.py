@@ -0,0 +1,137 @@
+"""
+mining.py – neblokuojantis kasimas (MiningJob)
+----------------------------------------------
+Blockchain.start_mining() grazina MiningJob, kuris kasa fonineje gijoje, o kviecianti gija
+(mazgas) gali toliau priimti tx ir blokus. Darbas:
+
+  * kas `chunk` nonce patikrina, ar nepasikeite tip'as / ar nepaprasytas refresh() –
+    tada ruosinys (kandidatai) perstatomas is dabartinio pool'o;
+  * kandidatai tikrinami paeiliui po `chunk` nonce (kaip gijos, bet be GIL konkurencijos);
+  * radus hash'a blokas prijungiamas po Blockchain.lock (jei tip'as nepasikeite).
+
+poll() – neblokuojantis rezultatas, cancel() – sustabdymas, result() – laukimas.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from block import pow_target, hash_to_hex
+
+
+class MiningJob:
+    RUNNING = "running"
+    FOUND = "found"
+    TIMEOUT = "timeout"
+    CANCELLED = "cancelled"
+    NO_CANDIDATES = "no_candidates"  # pool'e neliko galiojanciu tx
+    REJECTED = "rejected"            # rastas blokas nepraejo add_block
+    FAILED = "failed"                # isimtis fonineje gijoje (zr. job.error)
+
+    def __init__(self, blockchain, tx_pool, users_by_key, remove_from_pool, miners,
+                 block_reward: int = 50, time_limit: Optional[float] = None, chunk: int = 1024):
+        self.blockchain = blockchain
+        self.tx_pool = tx_pool
+        self.users_by_key = users_by_key
+        self.remove_from_pool = remove_from_pool
+        self.miners = miners
+        self.block_reward = block_reward
+        self.deadline = None if time_limit is None else time.time() + time_limit
+        self.chunk = chunk
+
+        self.status = self.RUNNING
+        self.block = None
+        self.error: Optional[BaseException] = None
+        self.templates = 0      # kiek kartu ruosinys statytas (1 + perstatymai)
+        self.attempts = 0
+
+        self._cancel = threading.Event()
+        self._refresh = threading.Event()
+        self._done = threading.Event()
+        self._work = None       # [[miner, block, midstate, nonce, step], ...]
+        self._thread = threading.Thread(target=self._run, name="mining-job", daemon=True)
+        self._thread.start()
+
+    # --- sasaja ---
+    def poll(self):
+        """Neblokuojantis: (status, blokas arba None)."""
+        return self.status, self.block
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def refresh(self) -> None:
+        """Perstatyti ruosini (pvz. atejo geresniu tx); tip'o pasikeitimas aptinkamas ir be sito."""
+        self._refresh.set()
+
+    def result(self, timeout: Optional[float] = None):
+        """Laukia pabaigos (iki timeout); grazina iskasta bloka arba None."""
+        self._done.wait(timeout)
+        return self.block
+
+    # --- foninis darbas ---
+    def _stale(self) -> bool:
+        if self._work is None or self._refresh.is_set():
+            return True
+        tip = self.blockchain.last_block
+        return tip is not None and self._work[0][1].prev_hash != tip.hash
+
+    def _rebuild(self) -> bool:
+        self._refresh.clear()
+        bc = self.blockchain
+        with bc.lock:
+            candidates = bc._round_candidates(
+                self.tx_pool, self.users_by_key, self.remove_from_pool, self.miners, self.block_reward
+            )
+        if not candidates:
+            return False
+        self._work = [[miner, block, block.pow_midstate(), start, step]
+                      for miner, block, start, step in candidates]
+        self.templates += 1
+        return True
+
+    def _search(self):
+        """Po `chunk` nonce kiekvienam kandidatui; grazina (miner, block, nonce, hash) arba None."""
+        for entry in self._work:
+            miner, block, midstate, nonce, step = entry
+            target = pow_target(block.difficulty)
+            for _ in range(self.chunk):
+                h = block.hash_int_from_midstate(midstate, nonce)
+                if h < target:
+                    return miner, block, nonce, hash_to_hex(h)
+                nonce += step
+            entry[3] = nonce
+            self.attempts += self.chunk
+        return None
+
+    def _run(self) -> None:
+        bc = self.blockchain
+        try:
+            while True:
+                if self._cancel.is_set():
+                    self.status = self.CANCELLED
+                    return
+                if self.deadline is not None and time.time() >= self.deadline:
+                    self.status = self.TIMEOUT
+                    return
+                if self._stale() and not self._rebuild():
+                    self.status = self.NO_CANDIDATES
+                    return
+                found = self._search()
+                if found is None:
+                    continue
+                with bc.lock:
+                    tip = bc.last_block
+                    if tip is not None and found[1].prev_hash != tip.hash:
+                        continue  # kol kasem, tip'as pasikeite – radinys nebeaktualus (perstatoma)
+                    self.block = bc._accept_mined(*found, self.block_reward, self.remove_from_pool, self.tx_pool)
+                self.status = self.FOUND if self.block is not None else self.REJECTED
+                return
+        except Exception as e:  # klaida perduodama per job.error, ne prarandama gijoje
+            self.error = e
+            self.status = self.FAILED
+        finally:
+            self._done.set()
@@ -0,0 +1,205 @@
+"""
+state_tree.py – retas (sparse) Merkle medis virs paskyru balansu
+-----------------------------------------------------------------
+Raktas – public_key kaip 256 bitu skaicius; kelias medyje – jo bitai nuo auksciausio.
+Kompaktiska forma: pomedis su vienu lapu nebeskaidomas, o tuscias pomedis turi konstanta:
+
+    tuscias pomedis  -> EMPTY_HASH
+    vienas lapas     -> custom_hash256(f"leaf|{pk}|{balance}")
+    kitaip           -> custom_hash256(kaire + desine)
+
+Raktai laikomi surikiuotame sarase (pomedzio lapai randami per bisect), vidiniu mazgu
+hash'ai – cache dict'e. Pakeitus balansa invaliduojamas tik to rakto kelias iki saknies,
+tad bloko pritaikymas kainuoja O(paliestu paskyru * gylis), ne O(visu paskyru).
+"""
+
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from custom_hash import custom_hash256
+
+KEY_BITS = 256
+EMPTY_HASH = custom_hash256("empty")
+
+
+def leaf_hash(pubkey: str, balance: int) -> str:
+    return custom_hash256(f"leaf|{pubkey}|{balance}")
+
+
+class StateTree:
+    def __init__(self, balances: Iterable[Tuple[str, int]] = ()):
+        self._balances: Dict[int, int] = {}     # raktas -> balansas
+        self._pubkeys: Dict[int, str] = {}      # raktas -> public_key (hex, kaip lapo hash'e)
+        self._keys: List[int] = []              # surikiuoti raktai
+        self._cache: Dict[Tuple[int, int], str] = {}  # (gylis, prefiksas) -> mazgo hash (>= 2 lapai)
+        for pubkey, balance in balances:
+            key = int(pubkey, 16)
+            self._balances[key] = balance
+            self._pubkeys[key] = pubkey
+        self._keys = sorted(self._balances)
+
+    @classmethod
+    def from_users(cls, users_by_key: Dict[str, "User"]) -> "StateTree":
+        return cls((pk, u.balance) for pk, u in users_by_key.items())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, pubkey: str) -> bool:
+        return int(pubkey, 16) in self._balances
+
+    def balance(self, pubkey: str) -> Optional[int]:
+        return self._balances.get(int(pubkey, 16))
+
+    # --- atnaujinimas ---
+    def set(self, pubkey: str, balance: int) -> None:
+        key = int(pubkey, 16)
+        old = self._balances.get(key)
+        if old == balance:
+            return
+        if old is None:
+            insort(self._keys, key)
+            self._pubkeys[key] = pubkey
+        self._balances[key] = balance
+        self._invalidate(key)
+
+    def update(self, balances: Iterable[Tuple[str, int]]) -> None:
+        for pubkey, balance in balances:
+            self.set(pubkey, balance)
+
+    def discard(self, pubkey: str) -> None:
+        """Pasalina paskyra (jei yra); jos kelias invaliduojamas, kol raktas dar sarase."""
+        key = int(pubkey, 16)
+        if key not in self._balances:
+            return
+        self._invalidate(key)
+        self._keys.pop(bisect_left(self._keys, key))
+        del self._balances[key]
+        del self._pubkeys[key]
+
+    @contextmanager
+    def applied(self, balances: Iterable[Tuple[str, int]]) -> Iterator["StateTree"]:
+        """Laikinai pritaiko balansus (pvz. ruosinio busena po bloko); iseinant medis atstatomas."""
+        saved = []
+        for pubkey, balance in balances:
+            saved.append((pubkey, self.balance(pubkey)))
+            self.set(pubkey, balance)
+        try:
+            yield self
+        finally:
+            for pubkey, balance in reversed(saved):
+                if balance is None:
+                    self.discard(pubkey)
+                else:
+                    self.set(pubkey, balance)
+
+    def root_with(self, balances: Iterable[Tuple[str, int]]) -> str:
+        """Saknis, jei balansai butu tokie; medis nepakeiciamas (O(pakeistu * gylis))."""
+        with self.applied(balances):
+            return self.root
+
+    def _invalidate(self, key: int) -> None:
+        # giliausias mazgas su >= 2 lapais rakto kelyje: bendro prefikso su kaimynu ilgis
+        i = bisect_left(self._keys, key)
+        depth = -1
+        for j in (i - 1, i + 1):
+            if 0 <= j < len(self._keys):
+                depth = max(depth, KEY_BITS - (key ^ self._keys[j]).bit_length())
+        # giliau rakto kelyje lieka vienas lapas – tokie mazgai necache'inami
+        for d in range(depth + 1):
+            self._cache.pop((d, key >> (KEY_BITS - d)), None)
+
+    # --- hash'ai ---
+    def _node(self, depth: int, prefix: int, lo: int, hi: int) -> str:
+        count = hi - lo
+        if count == 0:
+            return EMPTY_HASH
+        if count == 1:
+            key = self._keys[lo]
+            return leaf_hash(self._pubkeys[key], self._balances[key])
+        cached = self._cache.get((depth, prefix))
+        if cached is not None:
+            return cached
+        mid_key = (2 * prefix + 1) << (KEY_BITS - depth - 1)
+        mid = bisect_left(self._keys, mid_key, lo, hi)
+        h = custom_hash256(self._node(depth + 1, 2 * prefix, lo, mid) +
+                           self._node(depth + 1, 2 * prefix + 1, mid, hi))
+        self._cache[(depth, prefix)] = h
+        return h
+
+    @property
+    def root(self) -> str:
+        return self._node(0, 0, 0, len(self._keys))
+
+    # --- irodymai ---
+    def proof(self, pubkey: str) -> List[str]:
+        """Broliu hash'ai nuo saknies iki lapo gylio (kur pomedyje lieka tik sis raktas)."""
+        key = int(pubkey, 16)
+        if key not in self._balances:
+            raise KeyError(f"no account {pubkey[:8]}…")
+        siblings = []
+        lo, hi, prefix = 0, len(self._keys), 0
+        for depth in range(KEY_BITS):
+            if hi - lo == 1:
+                break
+            mid_key = (2 * prefix + 1) << (KEY_BITS - depth - 1)
+            mid = bisect_left(self._keys, mid_key, lo, hi)
+            if key >= mid_key:
+                siblings.append(self._node(depth + 1, 2 * prefix, lo, mid))
+                lo, prefix = mid, 2 * prefix + 1
+            else:
+                siblings.append(self._node(depth + 1, 2 * prefix + 1, mid, hi))
+                hi, prefix = mid, 2 * prefix
+        return siblings
+
+
+def verify_balance_proof(pubkey: str, balance: int, proof: List[str], root: str) -> bool:
+    """Patikrina, kad (pubkey, balance) yra busenos medyje su sia saknimi."""
+    key = int(pubkey, 16)
+    h = leaf_hash(pubkey, balance)
+    for depth in range(len(proof) - 1, -1, -1):
+        if (key >> (KEY_BITS - depth - 1)) & 1:
+            h = custom_hash256(proof[depth] + h)
+        else:
+            h = custom_hash256(h + proof[depth])
+    return h == root
+
+
+if __name__ == "__main__":  # inkrementinio atnaujinimo patikra pries pilna perskaiciavima
+    import random
+    import time
+
+    rng = random.Random(7)
+    accounts = {custom_hash256(f"user{i}"): rng.randint(100, 1_000_000) for i in range(2_000)}
+    tree = StateTree(accounts.items())
+    t0 = time.perf_counter()
+    root = tree.root
+    print(f"Pilnas medis ({len(tree)} paskyru): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    keys = list(accounts)
+    t0 = time.perf_counter()
+    for _ in range(20):  # 20 "bloku", kiekvienas liecia 50 paskyru (ir 2 naujas)
+        for pk in rng.sample(keys, 50):
+            accounts[pk] = rng.randint(0, 1_000_000)
+            tree.set(pk, accounts[pk])
+        for _ in range(2):
+            pk = custom_hash256(f"new{rng.random()}")
+            accounts[pk] = rng.randint(0, 1_000)
+            keys.append(pk)
+            tree.set(pk, accounts[pk])
+        root = tree.root
+    print(f"20 inkrementiniu atnaujinimu: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    assert root == StateTree(accounts.items()).root
+    for pk in rng.sample(keys, 20):
+        assert verify_balance_proof(pk, accounts[pk], tree.proof(pk), root)
+        assert not verify_balance_proof(pk, accounts[pk] + 1, tree.proof(pk), root)
+    print("✅ inkrementine saknis == pilnai perskaiciuota, irodymai galioja")
+
+    new_pk = custom_hash256("template-miner")
+    change = {keys[0]: accounts[keys[0]] + 5, new_pk: 50}
+    expected = StateTree({**accounts, **change}.items()).root
+    assert tree.root_with(change.items()) == expected
+    assert tree.root == root and new_pk not in tree
+    print("✅ root_with: ruosinio saknis teisinga, medis nepakeistas")
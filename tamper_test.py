@@ -80,13 +80,34 @@ def run_tamper_tests(bc: Blockchain):
     print(f"4️⃣ PoW tamper test: {pow_ok}")
     assert pow_ok is False, "❌ PoW tamper test failed – invalid PoW not detected!"
 
+    # 5️⃣ State root tamper (account blokai state_root isipareigoja antrasteje)
+    last = bc.chain[-1]
+    if last.state_root is not None:
+        original_root = last.state_root
+        last.state_root = "0" * 64
+        root_ok = last.is_valid_pow()
+        print(f"5️⃣ State root tamper test: {root_ok}")
+        assert root_ok is False, "❌ State root tamper test failed – header change not detected!"
+        last.state_root = original_root
+
     print("\n✅ Tamper detection working as expected if all asserts passed.")
 
 
 
+def load_blockchain_from_store(path: str) -> Blockchain:
+    """Load a blockchain from the append-only block store written by main.py."""
+    from block_store import BlockStore
+    bc = Blockchain.from_store(BlockStore(path))
+    print(f"✅ Loaded blockchain with {len(bc.chain)} blocks.")
+    return bc
+
+
 def main():
+    store_path = "blockchain_v0_2.blk"
     filename = "blockchain_v0_2.json"
-    if os.path.exists(filename):
+    if os.path.exists(store_path):
+        bc = load_blockchain_from_store(store_path)
+    elif os.path.exists(filename):
         bc = load_blockchain_from_json(filename)
     else:
         print("⚙️  No saved blockchain found, generating a quick demo chain…")
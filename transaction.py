@@ -1,14 +1,82 @@
-from custom_hash import custom_hash256
+from custom_hash import custom_hash256, custom_hash256_digest
+from functools import lru_cache
 import random
 import time
 
-class Transaction:
-    def __init__(self, sender: str, receiver: str, amount: int):
+
+# kiek kartu pakeistas jau sukurtos tx turinys ar id (visoms tx); Blockchain pagal ji sprendzia,
+# ar pilnas checkpoint'as dar galioja, neperziurint checkpoint'intu bloku transakciju
+_mutations = 0
+
+
+def mutation_count() -> int:
+    return _mutations
+
+
+@lru_cache(maxsize=16_384)
+def _id_matches(tx_id: bytes, serialized: str) -> bool:
+    """Ribotas LRU pagal (tx_id, turinys): ta pati tx is naujo deserializuota neperhashinama."""
+    return tx_id == custom_hash256_digest(serialized)
+
+
+class _VerifiedIdMixin:
+    """
+    verify_id() rezultatas laikomas objekte (_verified) ir nunulinamas, kai tik
+    priskiriamas bet kuris turinio laukas ar tx_id – klastote (tamper_test) vis tiek aptinkama.
+    """
+    __slots__ = ()
+    _CONTENT_FIELDS = frozenset()
+
+    def __setattr__(self, name, value):
+        if name in self._CONTENT_FIELDS:
+            if hasattr(self, "_id"):  # _id priskiriamas paskutinis – iki tol tx dar kuriama
+                global _mutations
+                _mutations += 1
+            object.__setattr__(self, name, value)
+            object.__setattr__(self, "_verified", None)
+        else:
+            object.__setattr__(self, name, value)
+
+    def verify_id(self) -> bool:
+        verified = self._verified
+        if verified is None:
+            verified = _id_matches(self._id, self.serialized_fields())
+            object.__setattr__(self, "_verified", verified)
+        return verified
+
+
+class Transaction(_VerifiedIdMixin):
+    # be __dict__: tx_id laikomas kaip 32 baitai, hex tik per tx_id property
+    __slots__ = ("sender", "receiver", "amount", "timestamp", "_id", "_verified")
+    _CONTENT_FIELDS = frozenset(("sender", "receiver", "amount", "timestamp", "_id"))
+
+    def __init__(self, sender: str, receiver: str, amount: int, timestamp: int | None = None):
         self.sender = sender
         self.receiver = receiver
         self.amount = amount
-        self.timestamp = int(time.time())
-        self.tx_id = self.compute_hash()
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+        self._id = custom_hash256_digest(self.serialized_fields())
+        self._verified = True  # id ka tik apskaiciuotas is turinio
+
+    @classmethod
+    def from_fields(cls, sender: str, receiver: str, amount: int, timestamp: int, tx_id: bytes) -> "Transaction":
+        """Atstato tx su jau zinomu id be perskaiciavimo (pvz. skaitant dataset'a); tikrinti per verify_id()."""
+        tx = cls.__new__(cls)
+        tx.sender, tx.receiver, tx.amount, tx.timestamp = sender, receiver, amount, timestamp
+        tx._id = tx_id
+        return tx
+
+    @property
+    def tx_id(self) -> str:
+        return self._id.hex()
+
+    @tx_id.setter
+    def tx_id(self, value: str) -> None:
+        self._id = bytes.fromhex(value)
+
+    @property
+    def tx_id_bytes(self) -> bytes:
+        return self._id
 
     def compute_hash(self) -> str:
         """create random transaction id"""
@@ -21,22 +89,34 @@ class Transaction:
     def serialized_fields(self) -> str:
         return f"{self.sender}|{self.receiver}|{self.amount}|{self.timestamp}"
 
-    def verify_id(self) -> bool:
-        data = f"{self.sender}|{self.receiver}|{self.amount}|{self.timestamp}"
-        return self.tx_id == custom_hash256(data)
-
 # === UTXO transakcijos ===
 from typing import List
 from utxo import TxIn, TxOut
 from custom_hash import custom_hash256
 import time
 
-class UTXOTransaction:
+class UTXOTransaction(_VerifiedIdMixin):
+    __slots__ = ("inputs", "outputs", "timestamp", "_id", "_verified")
+    _CONTENT_FIELDS = frozenset(("inputs", "outputs", "timestamp", "_id"))
+
     def __init__(self, inputs: List[TxIn], outputs: List[TxOut], timestamp: int | None = None):
-        self.inputs = inputs
-        self.outputs = outputs
+        # tuple + frozen TxIn/TxOut: po sukurimo inputu/outputu pakeisti nebegalima
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
         self.timestamp = int(time.time()) if timestamp is None else timestamp
-        self.tx_id = self.compute_hash()
+        self._id = custom_hash256_digest(self.serialized_fields())
+        self._verified = True
+
+    @classmethod
+    def from_fields(cls, inputs: List[TxIn], outputs: List[TxOut], timestamp: int, tx_id: bytes) -> "UTXOTransaction":
+        """Kaip Transaction.from_fields: jau zinomas id, be perhashinimo; tikrinti per verify_id()."""
+        tx = cls.__new__(cls)
+        tx.inputs, tx.outputs, tx.timestamp = tuple(inputs), tuple(outputs), timestamp
+        tx._id = tx_id
+        return tx
+
+    tx_id = Transaction.tx_id
+    tx_id_bytes = Transaction.tx_id_bytes
 
     # deterministinis serializavimas
     def serialized_fields(self) -> str:
@@ -47,9 +127,6 @@ class UTXOTransaction:
     def compute_hash(self) -> str:
         return custom_hash256(self.serialized_fields())
 
-    def verify_id(self) -> bool:
-        return self.tx_id == custom_hash256(self.serialized_fields())
-
     def __repr__(self):
         total_out = sum(o.amount for o in self.outputs)
         return f"UTXO(tx={self.tx_id[:8]}.., in={len(self.inputs)}, out={len(self.outputs)}, sum_out={total_out})"
@@ -62,3 +139,55 @@ class UTXOTransaction:
             "inputs": [{"prev_tx_id": i.prev_tx_id, "prev_index": i.prev_index} for i in self.inputs],
             "outputs": [{"receiver": o.receiver, "amount": o.amount} for o in self.outputs],
         }
+
+
+def transaction_from_dict(d: dict):
+    """Atstato tx is Block.to_dict() formato; issaugotas tx_id paliekamas (be perhashinimo), kad klastote butu aptinkama."""
+    tx_id = d.get("tx_id")
+    if d.get("type") == "utxo":
+        inputs = [TxIn(i["prev_tx_id"], i["prev_index"]) for i in d["inputs"]]
+        outputs = [TxOut(receiver=o["receiver"], amount=o["amount"]) for o in d["outputs"]]
+        if tx_id is None:
+            return UTXOTransaction(inputs=inputs, outputs=outputs, timestamp=d["timestamp"])
+        return UTXOTransaction.from_fields(inputs, outputs, d["timestamp"], bytes.fromhex(tx_id))
+    if tx_id is None:
+        return Transaction(d["sender"], d["receiver"], d["amount"], timestamp=d["timestamp"])
+    return Transaction.from_fields(d["sender"], d["receiver"], d["amount"], d["timestamp"], bytes.fromhex(tx_id))
+
+
+if __name__ == "__main__":  # atminties palyginimas: slotted Transaction vs senas __dict__ isdestymas
+    import tracemalloc
+
+    class DictTransaction:
+        """Senasis isdestymas: iprasta klase su __dict__ ir hex tx_id."""
+        def __init__(self, sender, receiver, amount, timestamp, tx_id):
+            self.sender = sender
+            self.receiver = receiver
+            self.amount = amount
+            self.timestamp = timestamp
+            self.tx_id = tx_id.hex()
+
+    def slotted(sender, receiver, amount, timestamp, tx_id):
+        return Transaction.from_fields(sender, receiver, amount, timestamp, bytes(bytearray(tx_id)))
+
+    N = 20_000
+    keys = [custom_hash256(f"user{i}") for i in range(100)]
+    # hash'ai suskaiciuojami pries tracemalloc (su juo custom_hash256 ~100x letesnis);
+    # matuojamas tik objektu isdestymas
+    rows = [(keys[i % 100], keys[(i + 1) % 100], 1_000 + i, 1_700_000_000 + i) for i in range(N)]
+    ids = [custom_hash256_digest("|".join(map(str, r))) for r in rows]
+
+    def measure(make) -> int:
+        tracemalloc.start()
+        txs = [make(*r, ids[i]) for i, r in enumerate(rows)]
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(txs) == N
+        return current
+
+    for name, make in (("DictTransaction", DictTransaction), ("Transaction", slotted)):
+        used = measure(make)
+        print(f"{name:16s} {used / 2**20:6.2f} MiB  ({used / N:6.1f} B/tx)")
+
+    sample = Transaction(*rows[0])
+    assert sample.tx_id_bytes == ids[0] and sample.verify_id()
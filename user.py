@@ -1,7 +1,7 @@
 import random
 import string
 from  custom_hash import custom_hash256
-from typing import Dict, Iterable, Tuple
+from typing import Dict, Iterable, Optional, Tuple
 
 
 class User:
@@ -14,29 +14,68 @@ class User:
         return f"{self.name} ({self.public_key[:8]}...) : {self.balance} coins" #Printinam pirmus 8 kad konsoles neuzkist, jei ka pakeisim
 
 
-def generate_public_key(name: str) -> str:
-    """generuoti Public key"""
-    salt = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+def generate_public_key(name: str, rng: Optional[random.Random] = None) -> str:
+    """generuoti Public key (rng – atkuriamam generavimui)"""
+    salt = ''.join((rng or random).choices(string.ascii_letters + string.digits, k=8))
     key_input = f"{name}{salt}"
     return custom_hash256(key_input)
     
-def generate_users(n: int = 1000):
+def generate_users(n: int = 1000, rng: Optional[random.Random] = None):
     """sugeneruot n vartotoju"""
+    rng = rng or random
     users = []
     for i in range(n):
         name = f"User{i+1}"
-        pub = generate_public_key(name)
-        balance = random.randint(100, 1_000_000)
+        pub = generate_public_key(name, rng)
+        balance = rng.randint(100, 1_000_000)
         users.append(User(name, pub, balance))
     return users
 
-def update_balances(transactions: Iterable, users_by_key: Dict[str, "User"]) -> Tuple[int, int]:
+class BalanceOverlay:
+    """
+    Copy-on-write balansu vaizdas virs users_by_key.
+    Saugo tik paliestu paskyru balansus; commit() juos iraso i User objektus,
+    discard() tiesiog pamirsta. Kaina O(paliestu paskyru), ne O(visu vartotoju).
+    """
+
+    def __init__(self, users_by_key: Dict[str, "User"]):
+        self.users_by_key = users_by_key
+        self._balances: Dict[str, int] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.users_by_key
+
+    def balance(self, key: str) -> int:
+        bal = self._balances.get(key)
+        return self.users_by_key[key].balance if bal is None else bal
+
+    def transfer(self, sender: str, receiver: str, amount: int) -> None:
+        self._balances[sender] = self.balance(sender) - amount
+        self._balances[receiver] = self.balance(receiver) + amount
+
+    def touched(self) -> Iterable[str]:
+        return self._balances.keys()
+
+    def commit(self) -> None:
+        for key, bal in self._balances.items():
+            self.users_by_key[key].balance = bal
+        self._balances.clear()
+
+    def discard(self) -> None:
+        self._balances.clear()
+
+
+def update_balances(
+    transactions: Iterable, users_by_key: Dict[str, "User"], applied_out: Optional[list] = None
+) -> Tuple[int, int]:
     """
     paskyros model update.
     skip tx jei siuntejas neturi pakankamai fondu/yra nezinomas
+    applied_out: jei duotas, i ji surasomos pritaikytos tx (bloko atjungimui)
     """
     applied = 0
     skipped = 0
+    overlay = BalanceOverlay(users_by_key)
     for tx in transactions:
         s = users_by_key.get(tx.sender)
         r = users_by_key.get(tx.receiver)
@@ -51,16 +90,19 @@ def update_balances(transactions: Iterable, users_by_key: Dict[str, "User"]) ->
             skipped += 1
             continue
 
-        if s.balance < tx.amount:
+        bal = overlay.balance(tx.sender)
+        if bal < tx.amount:
             print(f"Skipping tx {tx.tx_id[:8]}…: insufficient funds for {s.name} "
-                  f"(bal={s.balance}, amt={tx.amount}).")
+                  f"(bal={bal}, amt={tx.amount}).")
             skipped += 1
             continue
 
-        s.balance -= tx.amount
-        r.balance += tx.amount
+        overlay.transfer(tx.sender, tx.receiver, tx.amount)
         applied += 1
+        if applied_out is not None:
+            applied_out.append(tx)
 
+    overlay.commit()
     return applied, skipped
 
 if __name__ == "__main__": # debuginimui
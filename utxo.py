@@ -1,42 +1,108 @@
 # Paprastas UTXO rinkinys: (txid, idx) -> TxOut
 # Be elektroniniu parasu (cia supaprastintas modelis)
 
+from array import array
 from dataclasses import dataclass
 from typing import Dict, Tuple, List, Optional
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TxOut:
     receiver: str
     amount: int
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TxIn:
     prev_tx_id: str
     prev_index: int
 
+@dataclass
+class BlockUndo:
+    """Ko reikia bloko atjungimui: jo isleisti outputai ir jo sukurti outpoint'ai."""
+    spent: List[Tuple[TxIn, TxOut]]
+    created: List[TxIn]
+
+
+def select_coins(coins: List[Tuple[TxIn, TxOut]], amount: int) -> Optional[Tuple[List[TxIn], int]]:
+    """
+    Greedy coin selection: didziausi outputai pirmi, kol suma >= amount.
+    Grazina (inputs, total) arba None, jei savininkui neuztenka lesu.
+    """
+    chosen, total = [], 0
+    for txin, out in sorted(coins, key=lambda c: c[1].amount, reverse=True):
+        if total >= amount:
+            break
+        chosen.append(txin)
+        total += out.amount
+    return (chosen, total) if total >= amount else None
+
+
 class UTXOSet:
     def __init__(self):
         # key: (txid, index), value: TxOut
         self._map: Dict[Tuple[str, int], TxOut] = {}
+        # antrinis indeksas: receiver -> jo nespentu outputu raktai, ir jo balansas
+        self._by_owner: Dict[str, set] = {}
+        self._owner_balance: Dict[str, int] = {}
 
     def copy(self) -> "UTXOSet":
         clone = UTXOSet()
         clone._map = self._map.copy()
+        clone._by_owner = {k: v.copy() for k, v in self._by_owner.items()}
+        clone._owner_balance = self._owner_balance.copy()
         return clone
 
+    def _index_add(self, key: Tuple[str, int], out: TxOut) -> None:
+        self._by_owner.setdefault(out.receiver, set()).add(key)
+        self._owner_balance[out.receiver] = self._owner_balance.get(out.receiver, 0) + out.amount
+
+    def _index_remove(self, key: Tuple[str, int], out: TxOut) -> None:
+        keys = self._by_owner[out.receiver]
+        keys.discard(key)
+        if not keys:
+            del self._by_owner[out.receiver]
+            del self._owner_balance[out.receiver]
+        else:
+            self._owner_balance[out.receiver] -= out.amount
+
+    def overlay(self) -> "UTXOView":
+        """Pigus sluoksnis virs sio rinkinio (vietoj copy()): commit() arba discard()."""
+        return UTXOView(self)
+
     # ar egzistuoja nespentas out
     def has(self, txin: TxIn) -> bool:
         return (txin.prev_tx_id, txin.prev_index) in self._map
 
+    def get(self, txin: TxIn) -> Optional[TxOut]:
+        return self._map.get((txin.prev_tx_id, txin.prev_index))
+
     def get_amount(self, txin: TxIn) -> Optional[int]:
         o = self._map.get((txin.prev_tx_id, txin.prev_index))
         return o.amount if o else None
 
     def spend(self, txin: TxIn) -> Optional["TxOut"]:
-        return self._map.pop((txin.prev_tx_id, txin.prev_index), None)
+        key = (txin.prev_tx_id, txin.prev_index)
+        o = self._map.pop(key, None)
+        if o is not None:
+            self._index_remove(key, o)
+        return o
 
     def add_output(self, tx_id: str, index: int, out: TxOut) -> None:
-        self._map[(tx_id, index)] = out
+        key = (tx_id, index)
+        old = self._map.get(key)
+        if old is not None:
+            self._index_remove(key, old)
+        self._map[key] = out
+        self._index_add(key, out)
+
+    # --- savininko uzklausos (per indeksa, ne viso rinkinio perziura) ---
+    def balance_of(self, pubkey: str) -> int:
+        return self._owner_balance.get(pubkey, 0)
+
+    def coins_of(self, pubkey: str) -> List[Tuple[TxIn, TxOut]]:
+        return [(TxIn(*key), self._map[key]) for key in self._by_owner.get(pubkey, ())]
+
+    def select_coins(self, pubkey: str, amount: int) -> Optional[Tuple[List[TxIn], int]]:
+        return select_coins(self.coins_of(pubkey), amount)
 
     def __len__(self) -> int:
         return len(self._map)
@@ -45,3 +111,251 @@ class UTXOSet:
         # optional, jei reikes debuginti
         return {f"{k[0]}:{k[1]}": {"receiver": v.receiver, "amount": v.amount}
                 for k, v in self._map.items()}
+
+
+class PackedUTXOSet:
+    """
+    Kompaktiskas UTXOSet variantas su ta pacia sasaja (has/get/get_amount/spend/add_output, ...).
+    Raktas – 36 baitai (32B tx_id + 4B indeksas) vietoj (hex str, int) tuple; gavejai
+    internuojami i int id; sumos ir gaveju id laikomi array masyvuose pagal "slot" numeri.
+    TxOut objektai sukuriami tik grazinant. tx_id turi buti 64 simboliu hex (custom_hash256).
+    """
+
+    def __init__(self):
+        self._slots: Dict[bytes, int] = {}      # 36B raktas -> slot
+        self._keys: List[Optional[bytes]] = []  # slot -> raktas (None, jei laisvas)
+        self._amounts = array("q")              # slot -> amount
+        self._owners = array("I")               # slot -> receiver id
+        self._free: List[int] = []
+        self._receivers: List[str] = []         # receiver id -> pubkey
+        self._receiver_ids: Dict[str, int] = {}
+        self._by_owner: Dict[int, set] = {}     # receiver id -> slotai
+        self._owner_balance: Dict[int, int] = {}
+
+    @staticmethod
+    def _pack(tx_id: str, index: int) -> bytes:
+        return bytes.fromhex(tx_id) + index.to_bytes(4, "big")
+
+    @staticmethod
+    def _unpack(key: bytes) -> TxIn:
+        return TxIn(key[:32].hex(), int.from_bytes(key[32:], "big"))
+
+    def _slot(self, txin: TxIn) -> Optional[int]:
+        return self._slots.get(self._pack(txin.prev_tx_id, txin.prev_index))
+
+    def _out(self, slot: int) -> TxOut:
+        return TxOut(receiver=self._receivers[self._owners[slot]], amount=self._amounts[slot])
+
+    def copy(self) -> "PackedUTXOSet":
+        clone = PackedUTXOSet()
+        clone._slots = self._slots.copy()
+        clone._keys = self._keys[:]
+        clone._amounts = array("q", self._amounts)
+        clone._owners = array("I", self._owners)
+        clone._free = self._free[:]
+        clone._receivers = self._receivers[:]
+        clone._receiver_ids = self._receiver_ids.copy()
+        clone._by_owner = {k: v.copy() for k, v in self._by_owner.items()}
+        clone._owner_balance = self._owner_balance.copy()
+        return clone
+
+    def overlay(self) -> "UTXOView":
+        return UTXOView(self)
+
+    def has(self, txin: TxIn) -> bool:
+        return self._pack(txin.prev_tx_id, txin.prev_index) in self._slots
+
+    def get(self, txin: TxIn) -> Optional[TxOut]:
+        slot = self._slot(txin)
+        return None if slot is None else self._out(slot)
+
+    def get_amount(self, txin: TxIn) -> Optional[int]:
+        slot = self._slot(txin)
+        return None if slot is None else self._amounts[slot]
+
+    def spend(self, txin: TxIn) -> Optional[TxOut]:
+        slot = self._slots.pop(self._pack(txin.prev_tx_id, txin.prev_index), None)
+        if slot is None:
+            return None
+        out = self._out(slot)
+        self._release(slot)
+        return out
+
+    def _release(self, slot: int) -> None:
+        owner = self._owners[slot]
+        slots = self._by_owner[owner]
+        slots.discard(slot)
+        if not slots:
+            del self._by_owner[owner]
+            del self._owner_balance[owner]
+        else:
+            self._owner_balance[owner] -= self._amounts[slot]
+        self._keys[slot] = None
+        self._free.append(slot)
+
+    def add_output(self, tx_id: str, index: int, out: TxOut) -> None:
+        key = self._pack(tx_id, index)
+        old = self._slots.pop(key, None)
+        if old is not None:
+            self._release(old)
+
+        owner = self._receiver_ids.get(out.receiver)
+        if owner is None:
+            owner = self._receiver_ids[out.receiver] = len(self._receivers)
+            self._receivers.append(out.receiver)
+
+        if self._free:
+            slot = self._free.pop()
+            self._keys[slot] = key
+            self._amounts[slot] = out.amount
+            self._owners[slot] = owner
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._amounts.append(out.amount)
+            self._owners.append(owner)
+        self._slots[key] = slot
+        self._by_owner.setdefault(owner, set()).add(slot)
+        self._owner_balance[owner] = self._owner_balance.get(owner, 0) + out.amount
+
+    def balance_of(self, pubkey: str) -> int:
+        owner = self._receiver_ids.get(pubkey)
+        return 0 if owner is None else self._owner_balance.get(owner, 0)
+
+    def coins_of(self, pubkey: str) -> List[Tuple[TxIn, TxOut]]:
+        owner = self._receiver_ids.get(pubkey)
+        if owner is None:
+            return []
+        return [(self._unpack(self._keys[slot]), self._out(slot)) for slot in self._by_owner.get(owner, ())]
+
+    def select_coins(self, pubkey: str, amount: int) -> Optional[Tuple[List[TxIn], int]]:
+        return select_coins(self.coins_of(pubkey), amount)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        out = {}
+        for key, slot in self._slots.items():
+            txin = self._unpack(key)
+            out[f"{txin.prev_tx_id}:{txin.prev_index}"] = {
+                "receiver": self._receivers[self._owners[slot]], "amount": self._amounts[slot],
+            }
+        return out
+
+
+class UTXOView:
+    """
+    Sluoksniuotas UTXO vaizdas: skaito per bazini rinkini (UTXOSet arba kita UTXOView),
+    o isleidimus ir naujus outputus laiko mazame delta.
+    commit() pritaiko delta bazei, discard() ja pamirsta – bazes kopijuoti nereikia.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self._added: Dict[Tuple[str, int], TxOut] = {}   # nauji outputai siame sluoksnyje
+        self._spent: Dict[Tuple[str, int], TxOut] = {}   # bazes outputai, isleisti siame sluoksnyje
+
+    def overlay(self) -> "UTXOView":
+        return UTXOView(self)
+
+    def has(self, txin: TxIn) -> bool:
+        key = (txin.prev_tx_id, txin.prev_index)
+        if key in self._added:
+            return True
+        return key not in self._spent and self.base.has(txin)
+
+    def get(self, txin: TxIn) -> Optional[TxOut]:
+        key = (txin.prev_tx_id, txin.prev_index)
+        o = self._added.get(key)
+        if o is not None:
+            return o
+        return None if key in self._spent else self.base.get(txin)
+
+    def get_amount(self, txin: TxIn) -> Optional[int]:
+        o = self.get(txin)
+        return o.amount if o else None
+
+    def spend(self, txin: TxIn) -> Optional[TxOut]:
+        key = (txin.prev_tx_id, txin.prev_index)
+        o = self._added.pop(key, None)
+        if o is not None:
+            return o
+        if key in self._spent:
+            return None
+        o = self.base.get(txin)
+        if o is not None:
+            self._spent[key] = o
+        return o
+
+    def add_output(self, tx_id: str, index: int, out: TxOut) -> None:
+        key = (tx_id, index)
+        if key not in self._added and key not in self._spent:
+            # perrasomas bazes outputas laikomas isleistu: po spend() jis nebeisnyra, o undo ji atstato
+            old = self.base.get(TxIn(tx_id, index))
+            if old is not None:
+                self._spent[key] = old
+        self._added[key] = out
+
+    # --- savininko uzklausos: bazes indeksas + tik delta perziura ---
+    def balance_of(self, pubkey: str) -> int:
+        bal = self.base.balance_of(pubkey)
+        bal -= sum(o.amount for o in self._spent.values() if o.receiver == pubkey)
+        bal += sum(o.amount for o in self._added.values() if o.receiver == pubkey)
+        return bal
+
+    def coins_of(self, pubkey: str) -> List[Tuple[TxIn, TxOut]]:
+        coins = [(txin, o) for txin, o in self.base.coins_of(pubkey)
+                 if (txin.prev_tx_id, txin.prev_index) not in self._spent]
+        coins += [(TxIn(*key), o) for key, o in self._added.items() if o.receiver == pubkey]
+        return coins
+
+    def select_coins(self, pubkey: str, amount: int) -> Optional[Tuple[List[TxIn], int]]:
+        return select_coins(self.coins_of(pubkey), amount)
+
+    def commit(self) -> BlockUndo:
+        """Pritaiko delta bazei; grazina undo irasa, kuriuo bazes busena galima atstatyti."""
+        # perrasyti bazes outputai jau yra _spent (zr. add_output), tad undo juos atstato
+        undo = BlockUndo(
+            spent=[(TxIn(*key), o) for key, o in self._spent.items()],
+            created=[TxIn(*key) for key in self._added],
+        )
+
+        for tx_id, index in self._spent:
+            self.base.spend(TxIn(tx_id, index))
+        for (tx_id, index), out in self._added.items():
+            self.base.add_output(tx_id, index, out)
+        self.discard()
+        return undo
+
+    def discard(self) -> None:
+        self._added.clear()
+        self._spent.clear()
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self._spent) + len(self._added)
+
+
+if __name__ == "__main__":  # atminties palyginimas: dict UTXOSet vs PackedUTXOSet
+    import hashlib
+    import tracemalloc
+
+    N_COINS, N_OWNERS = 200_000, 10_000
+    owner_digests = [hashlib.sha256(f"owner{i}".encode()) for i in range(N_OWNERS)]
+
+    def measure(cls) -> int:
+        tracemalloc.start()
+        utxo = cls()
+        for i in range(N_COINS):
+            # tx_id ir receiver eilutes kuriamos is naujo, kaip is deserializuotu transakciju
+            tx_id = hashlib.sha256(f"tx{i}".encode()).hexdigest()
+            receiver = owner_digests[i % N_OWNERS].hexdigest()
+            utxo.add_output(tx_id, i % 3, TxOut(receiver=receiver, amount=1_000_000 + i))
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(utxo) == N_COINS
+        return current
+
+    for cls in (UTXOSet, PackedUTXOSet):
+        used = measure(cls)
+        print(f"{cls.__name__:14s} {used / 2**20:8.1f} MiB  ({used / N_COINS:6.1f} B/coin)")